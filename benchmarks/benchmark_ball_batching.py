@@ -0,0 +1,42 @@
+"""
+Benchmark BallTracker throughput on CPU for different predict batch sizes.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_ball_batching.py [video_path] [num_frames]
+"""
+import sys
+import time
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from trackers import BallTracker
+from utils import VideoFrameSource
+
+BATCH_SIZES = [1, 4, 8, 16]
+
+
+def benchmark_ball_batching(video_path="input_videos/input_video.mp4", num_frames=64):
+    frames = list(VideoFrameSource(video_path, end_frame=num_frames))
+    ball_tracker = BallTracker(model_path='models/yolo5_last.pt')
+    ball_tracker.model.to('cpu')
+
+    # Warm up so model fusing and first-call allocations are not timed
+    ball_tracker.detect_frame(frames[0])
+
+    print(f"Ball detection on {len(frames)} frames (CPU)")
+    print(f"{'batch':>6} {'seconds':>9} {'frames/s':>9}")
+    results = {}
+    for batch_size in BATCH_SIZES:
+        ball_tracker.batch_size = batch_size
+        start = time.perf_counter()
+        ball_tracker.detect_frames(frames)
+        elapsed = time.perf_counter() - start
+        results[batch_size] = len(frames) / elapsed
+        print(f"{batch_size:>6} {elapsed:>9.2f} {results[batch_size]:>9.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    video_path = sys.argv[1] if len(sys.argv) > 1 else "input_videos/input_video.mp4"
+    num_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    benchmark_ball_batching(video_path, num_frames)
@@ -0,0 +1,86 @@
+"""
+Single-box vs array geometry kernels from utils.bbox_utils.
+
+Each case runs the tuple-at-a-time function in a Python loop over N boxes,
+then the array counterpart once over an (N, 4) array, and checks that both
+give the same numbers.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_bbox_utils.py [num_boxes]
+"""
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import (get_center_of_bbox, get_foot_position, get_height_of_bbox, measure_distance,
+                   measure_xy_distance, get_closest_keypoint_index,
+                   get_centers_of_bboxes, get_foot_positions, get_heights_of_bboxes, measure_distances,
+                   measure_xy_distances, pairwise_distances, get_closest_keypoint_indices, as_keypoint_array)
+
+KEYPOINT_INDICES = (0, 2, 12, 13)
+
+
+def time_call(fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def make_inputs(num_boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    top_left = rng.uniform(0, 1800, (num_boxes, 2))
+    sizes = rng.uniform(10, 300, (num_boxes, 2))
+    bboxes = np.concatenate([top_left, top_left + sizes], axis=1)
+    points = rng.uniform(0, 1920, (num_boxes, 2))
+    keypoints = rng.uniform(0, 1080, 28)
+    return bboxes, points, keypoints
+
+
+def benchmark_bbox_utils(num_boxes=100000):
+    bboxes, points, keypoints = make_inputs(num_boxes)
+    bbox_list = bboxes.tolist()
+    point_list = points.tolist()
+    keypoint_list = keypoints.tolist()
+    keypoint_pairs = as_keypoint_array(keypoints).tolist()
+
+    cases = [
+        ("centers",
+         lambda: [get_center_of_bbox(bbox) for bbox in bbox_list],
+         lambda: get_centers_of_bboxes(bboxes)),
+        ("feet",
+         lambda: [get_foot_position(bbox) for bbox in bbox_list],
+         lambda: get_foot_positions(bboxes)),
+        ("heights",
+         lambda: [get_height_of_bbox(bbox) for bbox in bbox_list],
+         lambda: get_heights_of_bboxes(bboxes)),
+        ("distances",
+         lambda: [measure_distance(p1, p2) for p1, p2 in zip(point_list, bbox_list)],
+         lambda: measure_distances(points, bboxes[:, :2])),
+        ("xy distances",
+         lambda: [measure_xy_distance(p1, p2) for p1, p2 in zip(point_list, bbox_list)],
+         lambda: measure_xy_distances(points, bboxes[:, :2])),
+        ("closest keypoint",
+         lambda: [get_closest_keypoint_index(point, keypoint_list, KEYPOINT_INDICES) for point in point_list],
+         lambda: get_closest_keypoint_indices(points, keypoints, KEYPOINT_INDICES)),
+        ("min keypoint distance",
+         lambda: [min(measure_distance(point, keypoint) for keypoint in keypoint_pairs) for point in point_list],
+         lambda: pairwise_distances(points, as_keypoint_array(keypoints)).min(axis=1)),
+    ]
+
+    print(f"Geometry kernels on {num_boxes} boxes")
+    print(f"{'kernel':>22} {'loop ms':>10} {'array ms':>10} {'speedup':>9} {'max abs diff':>13}")
+    for name, loop_fn, array_fn in cases:
+        loop_time, loop_result = time_call(loop_fn)
+        array_time, array_result = time_call(array_fn)
+        difference = np.abs(np.asarray(loop_result, dtype=float) - np.asarray(array_result, dtype=float)).max()
+        print(f"{name:>22} {loop_time * 1000:>10.2f} {array_time * 1000:>10.2f} {loop_time / array_time:>8.1f}x {difference:>13.2e}")
+
+
+if __name__ == "__main__":
+    num_boxes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    benchmark_bbox_utils(num_boxes)
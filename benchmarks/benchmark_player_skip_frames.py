@@ -0,0 +1,75 @@
+"""
+Accuracy vs. speedup of skip-frame player detection.
+
+Replays tracker_stubs/player_detections.pkl (full-rate detections) as the
+detector: only keyframes are "detected" and the rest are filled in by
+trackers.skip_frame_detect. Every filled box is compared with the full-rate
+box of the same track ID. Speedup is the reduction in detector calls, which
+is what dominates runtime with yolov8x on CPU.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_player_skip_frames.py [stub_path]
+"""
+import sys
+import os
+import pickle
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from trackers.skip_frame_detection import skip_frame_detect
+
+SETTINGS = [
+    # (detection_interval, motion_threshold)
+    (2, None),
+    (3, None),
+    (5, None),
+    (10, None),
+    (10, 40.0),
+    (10, 20.0),
+]
+
+
+def bbox_iou(box_a, box_b):
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / (area_a + area_b - intersection)
+
+
+def evaluate(full_rate_detections, predicted_detections):
+    ious = []
+    missed = 0
+    for full_dict, predicted_dict in zip(full_rate_detections, predicted_detections):
+        for track_id, bbox in full_dict.items():
+            if track_id in predicted_dict:
+                ious.append(bbox_iou(bbox, predicted_dict[track_id]))
+            else:
+                missed += 1
+    return np.mean(ious), np.percentile(ious, 5), missed
+
+
+def benchmark_player_skip_frames(stub_path="tracker_stubs/player_detections.pkl"):
+    with open(stub_path, 'rb') as f:
+        full_rate_detections = pickle.load(f)
+    num_frames = len(full_rate_detections)
+
+    print(f"Skip-frame player detection vs full rate on {num_frames} frames")
+    print(f"{'interval':>8} {'motion px':>9} {'detector calls':>14} {'speedup':>8} {'mean IoU':>9} {'p5 IoU':>7} {'missed':>7}")
+    for detection_interval, motion_threshold in SETTINGS:
+        predicted, keyframes = skip_frame_detect(range(num_frames),
+                                                 lambda frame_num: full_rate_detections[frame_num],
+                                                 detection_interval,
+                                                 motion_threshold)
+        mean_iou, p5_iou, missed = evaluate(full_rate_detections, predicted)
+        speedup = num_frames / len(keyframes)
+        threshold = '-' if motion_threshold is None else f"{motion_threshold:.1f}"
+        print(f"{detection_interval:>8} {threshold:>9} {len(keyframes):>14} {speedup:>7.2f}x {mean_iou:>9.3f} {p5_iou:>7.3f} {missed:>7}")
+
+
+if __name__ == "__main__":
+    stub_path = sys.argv[1] if len(sys.argv) > 1 else "tracker_stubs/player_detections.pkl"
+    benchmark_player_skip_frames(stub_path)
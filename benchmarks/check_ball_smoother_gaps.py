@@ -0,0 +1,77 @@
+"""
+Checks that BallKalmanSmoother stays inside the detected range across gaps.
+
+Cuts gaps out of tracker_stubs/ball_detections.pkl: a 2 s gap in the middle
+of the video, a long trailing gap and a long leading gap. Both the offline
+smoother (with and without the RTS pass) and streaming update() must keep
+every bridged box inside the per-coordinate range of the detections, and the
+offline smoother must leave frames before the first and after the last
+detection empty.
+
+Usage (from the repository root):
+    python benchmarks/check_ball_smoother_gaps.py [stub_path] [fps]
+"""
+import sys
+import os
+import pickle
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from trackers.ball_smoother import BallKalmanSmoother
+
+
+def cut_gap(ball_positions, start, end):
+    return [{} if start <= frame_num < end else ball_dict for frame_num, ball_dict in enumerate(ball_positions)]
+
+
+def detected_range(ball_positions):
+    boxes = np.array([ball_dict[1] for ball_dict in ball_positions if ball_dict.get(1) is not None], dtype=float)
+    return boxes.min(axis=0), boxes.max(axis=0)
+
+
+def check_in_range(name, ball_positions, smoothed_positions, detected_min, detected_max):
+    # Only bridged frames are checked, smoothing may move a detected box by a few pixels
+    boxes = np.array([smoothed_dict[1] for ball_dict, smoothed_dict in zip(ball_positions, smoothed_positions)
+                      if smoothed_dict and ball_dict.get(1) is None], dtype=float)
+    low, high = boxes.min(axis=0), boxes.max(axis=0)
+    print(f"{name:>30}: y1 {low[1]:8.1f} .. {high[1]:8.1f}  (detected {detected_min[1]:.1f} .. {detected_max[1]:.1f})")
+    assert np.all(low >= detected_min - 1e-6) and np.all(high <= detected_max + 1e-6), \
+        f"{name}: smoothed boxes leave the detected range"
+
+
+def check_span(name, ball_positions, smoothed_positions):
+    detected_frames = [frame_num for frame_num, ball_dict in enumerate(ball_positions) if ball_dict.get(1) is not None]
+    first, last = detected_frames[0], detected_frames[-1]
+    outside = [frame_num for frame_num, ball_dict in enumerate(smoothed_positions)
+               if ball_dict and not first <= frame_num <= last]
+    assert not outside, f"{name}: {len(outside)} frames filled outside detections {first}..{last}"
+
+
+def check_ball_smoother_gaps(stub_path="tracker_stubs/ball_detections.pkl", fps=24):
+    with open(stub_path, 'rb') as f:
+        ball_positions = pickle.load(f)
+    num_frames = len(ball_positions)
+    middle = num_frames // 2
+
+    cases = {
+        '2 s gap': cut_gap(ball_positions, middle, middle + 2 * fps),
+        'trailing gap': cut_gap(ball_positions, num_frames - min(300, num_frames // 2), num_frames),
+        'leading gap': cut_gap(ball_positions, 0, min(100, num_frames // 2)),
+    }
+    for case_name, gapped_positions in cases.items():
+        detected_min, detected_max = detected_range(gapped_positions)
+        for rts in (True, False):
+            name = f"{case_name} smooth(rts={rts})"
+            smoothed_positions = BallKalmanSmoother().smooth(gapped_positions, rts=rts)
+            check_in_range(name, gapped_positions, smoothed_positions, detected_min, detected_max)
+            check_span(name, gapped_positions, smoothed_positions)
+        smoother = BallKalmanSmoother()
+        streamed_positions = [smoother.update(ball_dict) for ball_dict in gapped_positions]
+        check_in_range(f"{case_name} update()", gapped_positions, streamed_positions, detected_min, detected_max)
+    print("All gaps stay inside the detected range")
+
+
+if __name__ == "__main__":
+    stub_path = sys.argv[1] if len(sys.argv) > 1 else "tracker_stubs/ball_detections.pkl"
+    fps = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    check_ball_smoother_gaps(stub_path, fps)
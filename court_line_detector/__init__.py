@@ -1 +1,2 @@
-from .court_line_detector import CourtLineDetector
\ No newline at end of file
+from .court_line_detector import CourtLineDetector
+from .court_tracker import CourtTracker, CourtTimeline
\ No newline at end of file
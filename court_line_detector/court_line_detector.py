@@ -1,36 +1,107 @@
+import os
 import torch
-import torchvision.transforms as transforms
 import cv2
 from torchvision import models
 import numpy as np
+import sys
+sys.path.append('../')
+from utils import hash_file
 
 class CourtLineDetector:
-    def __init__(self, model_path):
-        self.model = models.resnet50(pretrained=True)
-        self.model.fc = torch.nn.Linear(self.model.fc.in_features, 14*2) 
+    IMAGE_SIZE = 224
+    MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+    BACKENDS = ('torch', 'quantized', 'torchscript', 'onnx')
+
+    def __init__(self, model_path, backend='torch', onnx_path=None):
+        """backend selects the CPU inference path:
+            'torch'        plain eager ResNet50
+            'quantized'    dynamic INT8 quantization (only the final Linear layer is
+                           quantizable this way, the convolutions stay float)
+            'torchscript'  traced and frozen graph with fused conv/batch-norm
+            'onnx'         onnxruntime session, exported next to the weights
+                           (or to onnx_path) on first use and again whenever
+                           the weights change
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {self.BACKENDS}")
+        self.backend = backend
+
+        # The ImageNet weights would be overwritten by the checkpoint, so never download them
+        self.model = models.resnet50(weights=None)
+        self.model.fc = torch.nn.Linear(self.model.fc.in_features, 14*2)
         self.model.load_state_dict(torch.load(model_path, map_location='cpu'))
-        self.transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        # Batch norm must use its running statistics, otherwise a frame's keypoints
+        # would depend on which other frames share its batch
+        self.model.eval()
 
-    def predict(self, image):
+        self.onnx_session = None
+        if backend == 'quantized':
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif backend == 'torchscript':
+            example = torch.zeros(1, 3, self.IMAGE_SIZE, self.IMAGE_SIZE)
+            with torch.no_grad():
+                self.model = torch.jit.optimize_for_inference(torch.jit.trace(self.model, example))
+        elif backend == 'onnx':
+            self.onnx_session = self.load_onnx_session(onnx_path or model_path.rsplit('.', 1)[0] + '.onnx', model_path)
+
+    def load_onnx_session(self, onnx_path, model_path):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("backend='onnx' needs the onnxruntime package") from e
+
+        # The export records the hash of the weights it came from, so replaced
+        # weights are re-exported instead of running a stale graph
+        weights_hash = hash_file(model_path)
+        hash_path = onnx_path + '.sha256'
+        exported_hash = None
+        if os.path.exists(onnx_path) and os.path.exists(hash_path):
+            with open(hash_path) as f:
+                exported_hash = f.read().strip()
+        if exported_hash != weights_hash:
+            example = torch.zeros(1, 3, self.IMAGE_SIZE, self.IMAGE_SIZE)
+            torch.onnx.export(self.model, example, onnx_path,
+                              input_names=['image'], output_names=['keypoints'],
+                              dynamic_axes={'image': {0: 'batch'}, 'keypoints': {0: 'batch'}})
+            with open(hash_path, 'w') as f:
+                f.write(weights_hash)
+        return onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+
+    def preprocess(self, images):
+        # cv2/numpy replacement for ToPILImage -> Resize -> ToTensor -> Normalize,
+        # writing straight into one contiguous NCHW batch
+        batch = np.empty((len(images), 3, self.IMAGE_SIZE, self.IMAGE_SIZE), dtype=np.float32)
+        for index, image in enumerate(images):
+            resized = cv2.resize(image, (self.IMAGE_SIZE, self.IMAGE_SIZE), interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+            batch[index] = ((rgb - self.MEAN) / self.STD).transpose(2, 0, 1)
+        return batch
 
-    
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image_tensor = self.transform(image_rgb).unsqueeze(0)
-        with torch.no_grad():
-            outputs = self.model(image_tensor)
-        keypoints = outputs.squeeze().cpu().numpy()
-        original_h, original_w = image.shape[:2]
-        keypoints[::2] *= original_w / 224.0
-        keypoints[1::2] *= original_h / 224.0
+    def predict_batch(self, images, batch_size=16):
+        keypoints = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            batch = self.preprocess(chunk)
+            if self.onnx_session is not None:
+                outputs = self.onnx_session.run(None, {'image': batch})[0]
+            else:
+                with torch.no_grad():
+                    outputs = self.model(torch.from_numpy(batch)).cpu().numpy()
 
+            for image, image_keypoints in zip(chunk, outputs):
+                original_h, original_w = image.shape[:2]
+                image_keypoints = image_keypoints.copy()
+                image_keypoints[::2] *= original_w / float(self.IMAGE_SIZE)
+                image_keypoints[1::2] *= original_h / float(self.IMAGE_SIZE)
+                keypoints.append(image_keypoints)
         return keypoints
 
-    def draw_keypoints(self, image, keypoints):
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
+    @staticmethod
+    def draw_keypoints(image, keypoints):
         # Plot keypoints on the image
         for i in range(0, len(keypoints), 2):
             x = int(keypoints[i])
@@ -38,10 +109,19 @@ class CourtLineDetector:
             cv2.putText(image, str(i//2), (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
             cv2.circle(image, (x, y), 5, (0, 0, 255), -1)
         return image
-    
+
     def draw_keypoints_on_video(self, video_frames, keypoints):
-        output_video_frames = []
         for frame in video_frames:
-            frame = self.draw_keypoints(frame, keypoints)
-            output_video_frames.append(frame)
-        return output_video_frames
\ No newline at end of file
+            yield self.draw_keypoints(frame, keypoints)
+
+    @staticmethod
+    def draw_court_timeline_frame(frame, frame_num, court_timeline):
+        # Static like draw_keypoints, so stored results can be drawn without loading the model
+        segment = court_timeline.segment_for_frame(frame_num)
+        if segment['court_visible']:
+            frame = CourtLineDetector.draw_keypoints(frame, segment['keypoints'])
+        return frame
+
+    def draw_court_timeline_on_video(self, video_frames, court_timeline):
+        for frame_num, frame in enumerate(video_frames):
+            yield self.draw_court_timeline_frame(frame, frame_num, court_timeline)
@@ -0,0 +1,141 @@
+import bisect
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+import constants
+
+
+def court_reference_points():
+    # The 14 court keypoints in metres, in CourtLineDetector / MiniCourt order
+    width = constants.DOUBLE_LINE_WIDTH
+    length = constants.HALF_COURT_LINE_HEIGHT*2
+    ally = constants.DOUBLE_ALLY_DIFFERENCE
+    single = constants.SINGLE_LINE_WIDTH
+    no_mans_land = constants.NO_MANS_LAND_HEIGHT
+    return np.array([
+        (0, 0), (width, 0), (0, length), (width, length),
+        (ally, 0), (ally, length), (width - ally, 0), (width - ally, length),
+        (ally, no_mans_land), (ally + single, no_mans_land),
+        (ally, length - no_mans_land), (ally + single, length - no_mans_land),
+        (ally + single / 2, no_mans_land), (ally + single / 2, length - no_mans_land),
+    ], dtype=np.float32)
+
+
+class CourtTimeline:
+    """Court keypoints per segment of the video.
+
+    segments is a list of dicts with start_frame, end_frame (exclusive),
+    keypoints (the 28-value array from CourtLineDetector.predict) and
+    court_visible, False when those keypoints do not describe a court.
+    """
+
+    def __init__(self, segments, num_frames):
+        self.segments = segments
+        self.num_frames = num_frames
+        self._starts = [segment['start_frame'] for segment in segments]
+
+    def segment_for_frame(self, frame_num):
+        return self.segments[bisect.bisect_right(self._starts, frame_num) - 1]
+
+    def keypoints_for_frame(self, frame_num):
+        return self.segment_for_frame(frame_num)['keypoints']
+
+    @property
+    def court_visible(self):
+        mask = np.zeros(self.num_frames, dtype=bool)
+        for segment in self.segments:
+            mask[segment['start_frame']:segment['end_frame']] = segment['court_visible']
+        return mask
+
+    def first_visible_keypoints(self):
+        for segment in self.segments:
+            if segment['court_visible']:
+                return segment['keypoints']
+        return None
+
+
+class CourtTracker:
+    """Re-runs court keypoint detection only when the shot changes.
+
+    Each frame is reduced to a small grayscale thumbnail and compared with the
+    thumbnail the current keypoints came from. A mean absolute difference above
+    scene_change_threshold (0-255 scale), or redetect_interval_seconds without a
+    detection, triggers CourtLineDetector.predict. Predictions whose keypoints
+    do not fit a tennis court under a homography (replays, close-ups, crowd
+    shots) are flagged with court_visible=False so downstream stats skip them.
+    """
+
+    def __init__(self, court_line_detector, fps=24, scene_change_threshold=25.0,
+                 redetect_interval_seconds=10.0, max_court_fit_error=0.02, thumbnail_size=(64, 36)):
+        self.court_line_detector = court_line_detector
+        self.fps = fps
+        self.scene_change_threshold = scene_change_threshold
+        self.redetect_interval_frames = int(redetect_interval_seconds * fps) if redetect_interval_seconds else None
+        self.max_court_fit_error = max_court_fit_error
+        self.thumbnail_size = thumbnail_size
+        self.reference_points = court_reference_points()
+        self.reset()
+
+    def reset(self):
+        self.segments = []
+        self.num_frames = 0
+        self.detections_run = 0
+        self._reference_thumbnail = None
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def is_scene_change(self, thumbnail):
+        if self._reference_thumbnail is None:
+            return True
+        return float(np.mean(np.abs(thumbnail - self._reference_thumbnail))) > self.scene_change_threshold
+
+    def is_court(self, keypoints, frame_shape):
+        points = np.asarray(keypoints, dtype=np.float32).reshape(-1, 2)
+        frame_height, frame_width = frame_shape[:2]
+        margin = 0.1
+        inside = ((points[:, 0] > -margin * frame_width) & (points[:, 0] < (1 + margin) * frame_width) &
+                  (points[:, 1] > -margin * frame_height) & (points[:, 1] < (1 + margin) * frame_height))
+        if not inside.all():
+            return False
+
+        homography, _ = cv2.findHomography(self.reference_points, points, 0)
+        if homography is None:
+            return False
+        reprojected = cv2.perspectiveTransform(self.reference_points.reshape(-1, 1, 2), homography).reshape(-1, 2)
+        error = np.linalg.norm(reprojected - points, axis=1).mean()
+        return bool(error < self.max_court_fit_error * np.hypot(frame_width, frame_height))
+
+    def update(self, frame_num, frame):
+        """Process the next frame, returns True when the court was re-detected."""
+        self.num_frames = frame_num + 1
+        thumbnail = self.thumbnail(frame)
+
+        since_last_detection = frame_num - self.segments[-1]['start_frame'] if self.segments else None
+        periodic = (self.redetect_interval_frames is not None and since_last_detection is not None
+                    and since_last_detection >= self.redetect_interval_frames)
+        if not self.is_scene_change(thumbnail) and not periodic:
+            self.segments[-1]['end_frame'] = self.num_frames
+            return False
+
+        keypoints = self.court_line_detector.predict(frame)
+        self.detections_run += 1
+        self._reference_thumbnail = thumbnail
+        self.segments.append({
+            'start_frame': frame_num,
+            'end_frame': self.num_frames,
+            'keypoints': keypoints,
+            'court_visible': self.is_court(keypoints, frame.shape),
+        })
+        return True
+
+    def track(self, frames):
+        self.reset()
+        for frame_num, frame in enumerate(frames):
+            self.update(frame_num, frame)
+        return self.timeline()
+
+    def timeline(self):
+        return CourtTimeline(self.segments, self.num_frames)
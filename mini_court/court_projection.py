@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+
+class CourtProjector:
+    """Maps video pixels to mini court pixels with a single court homography.
+
+    The homography is fitted once from the 14 CourtLineDetector keypoints to the
+    matching MiniCourt drawing keypoints (RANSAC drops keypoints the detector
+    got wrong). Projecting is then one cv2.perspectiveTransform call for any
+    number of points, and stays accurate over the full depth of the court
+    because perspective is modelled instead of scaled from player height.
+    """
+
+    def __init__(self, court_keypoints, drawing_key_points, ransac_reproj_threshold=5.0):
+        source_points = np.asarray(court_keypoints, dtype=np.float32).reshape(-1, 2)
+        destination_points = np.asarray(drawing_key_points, dtype=np.float32).reshape(-1, 2)
+        self.homography, inliers = cv2.findHomography(source_points,
+                                                      destination_points,
+                                                      cv2.RANSAC,
+                                                      ransac_reproj_threshold)
+        if self.homography is None:
+            raise ValueError("Could not fit a court homography from the given keypoints")
+        self.inliers = inliers.ravel().astype(bool)
+
+    def project_points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        if len(points) == 0:
+            return np.empty((0, 2))
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def project_detections(self, player_detections, ball_detections):
+        """Project player feet and ball centres for every frame in one call.
+
+        Returns ([{player_id: (x, y)}], [{1: (x, y)}]) in mini court pixels,
+        the same shape as MiniCourt.convert_bounding_boxes_to_mini_court_coordinates.
+        """
+        points = []
+        owners = []
+        for frame_num, player_dict in enumerate(player_detections):
+            for player_id, bbox in player_dict.items():
+                # Foot position: bottom centre of the box
+                points.append(((bbox[0] + bbox[2]) / 2, bbox[3]))
+                owners.append((frame_num, player_id))
+        num_player_points = len(points)
+        for frame_num, ball_dict in enumerate(ball_detections):
+            bbox = ball_dict.get(1)
+            if bbox is not None and len(bbox) == 4:
+                points.append(((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2))
+                owners.append((frame_num, 1))
+
+        projected = self.project_points(points).tolist()
+
+        output_player_boxes = [{} for _ in player_detections]
+        output_ball_boxes = [{} for _ in ball_detections]
+        for index, ((frame_num, object_id), position) in enumerate(zip(owners, projected)):
+            if index < num_player_points:
+                output_player_boxes[frame_num][object_id] = tuple(position)
+            else:
+                output_ball_boxes[frame_num][object_id] = tuple(position)
+        return output_player_boxes, output_ball_boxes
@@ -3,17 +3,28 @@ import numpy as np
 import sys
 sys.path.append('../')
 import constants
+from .court_projection import CourtProjector
 from utils import (
     convert_meters_to_pixel_distance,
     convert_pixel_distance_to_meters,
-    get_foot_position,
-    get_closest_keypoint_index,
-    get_height_of_bbox,
     measure_xy_distance,
-    get_center_of_bbox,
-    measure_distance
+    as_keypoint_array,
+    get_centers_of_bboxes,
+    get_foot_positions,
+    get_heights_of_bboxes,
+    measure_distances,
+    measure_xy_distances,
+    get_closest_keypoint_indices
 )
 
+def sliding_window_max(values, before, after):
+    # Max over [i-before, i+after) along the last axis, computed for every i at once
+    num_frames = values.shape[-1]
+    pad_width = [(0, 0)] * (values.ndim - 1) + [(before, after - 1)]
+    padded = np.pad(values, pad_width, constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, before + after, axis=-1)
+    return windows.max(axis=-1)[..., :num_frames]
+
 class MiniCourt():
     def __init__(self,frame):
         self.drawing_rectangle_width = 250
@@ -25,6 +36,7 @@ class MiniCourt():
         self.set_mini_court_position()
         self.set_court_drawing_key_points()
         self.set_court_lines()
+        self.set_overlay_tile()
 
 
     def convert_meters_to_pixels(self, meters):
@@ -138,13 +150,36 @@ class MiniCourt():
 
         return out
 
+    def set_overlay_tile(self):
+        # Render the background box and court once. Drawing the court on a black and
+        # on a white canvas tells which pixels it covers (they come out identical).
+        height, width = self.end_y + 1, self.end_x + 1
+        on_black = self.draw_court(np.zeros((height, width, 3), np.uint8))
+        on_white = self.draw_court(np.full((height, width, 3), 255, np.uint8))
+        roi = (slice(self.start_y, self.end_y + 1), slice(self.start_x, self.end_x + 1))
+        court_pixels = np.all(on_black[roi] == on_white[roi], axis=2)
+
+        # BGRA tile: 50% white background box, opaque court lines and keypoints
+        color = np.where(court_pixels[:, :, None], on_black[roi], 255).astype(np.uint8)
+        alpha = np.where(court_pixels, 255, 128).astype(np.uint8)
+        self.overlay_tile = np.dstack([color, alpha])
+        self.overlay_roi = roi
+
+        # Blending only needs the white layer and the opaque pixels as index lists
+        self._overlay_background = np.full(color.shape, 255, np.uint8)
+        self._overlay_court_ys, self._overlay_court_xs = np.nonzero(court_pixels)
+        self._overlay_court_colors = color[court_pixels]
+
+    def draw_overlay(self, frame):
+        # Blend the pre-rendered tile into its slice of the frame, in place
+        roi = frame[self.overlay_roi]
+        cv2.addWeighted(roi, 0.5, self._overlay_background, 0.5, 0, dst=roi)
+        roi[self._overlay_court_ys, self._overlay_court_xs] = self._overlay_court_colors
+        return frame
+
     def draw_mini_court(self,frames):
-        output_frames = []
         for frame in frames:
-            frame = self.draw_background_rectangle(frame)
-            frame = self.draw_court(frame)
-            output_frames.append(frame)
-        return output_frames
+            yield self.draw_overlay(frame)
 
     def get_start_point_of_mini_court(self):
         return (self.court_start_x,self.court_start_y)
@@ -186,67 +221,115 @@ class MiniCourt():
 
         return  mini_court_player_position
 
+    def get_mini_court_coordinates_array(self,
+                                         object_positions,
+                                         original_court_key_points,
+                                         player_heights_in_pixels,
+                                         player_heights_in_meters,
+                                         keypoint_indices=(0,2,12,13)):
+        # Array version of get_mini_court_coordinates for (N, 2) positions
+        closest = get_closest_keypoint_indices(object_positions, original_court_key_points, keypoint_indices)
+        closest_key_points = as_keypoint_array(original_court_key_points)[closest]
+
+        distance_pixels = measure_xy_distances(object_positions, closest_key_points)
+        distance_meters = distance_pixels * (np.asarray(player_heights_in_meters) / np.asarray(player_heights_in_pixels))[:, None]
+        mini_court_distance_pixels = self.convert_meters_to_pixels(distance_meters)
+
+        closest_mini_court_key_points = as_keypoint_array(self.drawing_key_points)[closest]
+        return closest_mini_court_key_points + mini_court_distance_pixels
+
     def convert_bounding_boxes_to_mini_court_coordinates(self,player_boxes, ball_boxes, original_court_key_points ):
         player_heights = {
             1: constants.PLAYER_1_HEIGHT_METERS,
             2: constants.PLAYER_2_HEIGHT_METERS
         }
 
-        output_player_boxes= []
-        output_ball_boxes= []
+        num_frames = len(player_boxes)
+        player_ids = sorted({player_id for player_bbox in player_boxes for player_id in player_bbox})
 
+        # One pass over the dicts, everything after works on (frames, ...) arrays
+        boxes = np.full((len(player_ids), num_frames, 4), np.nan)
         for frame_num, player_bbox in enumerate(player_boxes):
-            ball_box = ball_boxes[frame_num][1]
-            ball_position = get_center_of_bbox(ball_box)
-            closest_player_id_to_ball = min(player_bbox.keys(), key=lambda x: measure_distance(ball_position, get_center_of_bbox(player_bbox[x])))
-
-            output_player_bboxes_dict = {}
-            for player_id, bbox in player_bbox.items():
-                foot_position = get_foot_position(bbox)
-
-                # Get The closest keypoint in pixels
-                closest_key_point_index = get_closest_keypoint_index(foot_position,original_court_key_points, [0,2,12,13])
-                closest_key_point = (original_court_key_points[closest_key_point_index*2], 
-                                     original_court_key_points[closest_key_point_index*2+1])
-
-                # Get Player height in pixels
-                frame_index_min = max(0, frame_num-20)
-                frame_index_max = min(len(player_boxes), frame_num+50)
-                bboxes_heights_in_pixels = [get_height_of_bbox(player_boxes[i][player_id]) for i in range (frame_index_min,frame_index_max)]
-                max_player_height_in_pixels = max(bboxes_heights_in_pixels)
-
-                mini_court_player_position = self.get_mini_court_coordinates(foot_position,
-                                                                            closest_key_point, 
-                                                                            closest_key_point_index, 
-                                                                            max_player_height_in_pixels,
-                                                                            player_heights[player_id]
-                                                                            )
-                
-                output_player_bboxes_dict[player_id] = mini_court_player_position
-
-                if closest_player_id_to_ball == player_id:
-                    # Get The closest keypoint in pixels
-                    closest_key_point_index = get_closest_keypoint_index(ball_position,original_court_key_points, [0,2,12,13])
-                    closest_key_point = (original_court_key_points[closest_key_point_index*2], 
-                                        original_court_key_points[closest_key_point_index*2+1])
-                    
-                    mini_court_player_position = self.get_mini_court_coordinates(ball_position,
-                                                                            closest_key_point, 
-                                                                            closest_key_point_index, 
-                                                                            max_player_height_in_pixels,
-                                                                            player_heights[player_id]
-                                                                            )
-                    output_ball_boxes.append({1:mini_court_player_position})
-            output_player_boxes.append(output_player_bboxes_dict)
+            for player_index, player_id in enumerate(player_ids):
+                if player_id in player_bbox:
+                    boxes[player_index, frame_num] = player_bbox[player_id]
+        ball_box = np.array([ball_boxes[frame_num].get(1, [np.nan]*4) for frame_num in range(num_frames)], dtype=float).reshape(num_frames, 4)
+
+        # Max player height over frames [frame_num-20, frame_num+50), once for the whole video
+        heights = np.where(np.isnan(boxes[:, :, 3]), -np.inf, get_heights_of_bboxes(boxes))
+        max_heights = sliding_window_max(heights, 20, 50)
+
+        foot_positions = get_foot_positions(boxes)
+        player_centers = get_centers_of_bboxes(boxes)
+        ball_positions = get_centers_of_bboxes(ball_box)
+
+        present = ~np.isnan(boxes[:, :, 0])
+        ball_distances = np.where(present, measure_distances(player_centers, ball_positions[None]), np.inf)
+        closest_player_index = np.argmin(ball_distances, axis=0)
+        frames_with_players = present.any(axis=0)
+
+        player_positions = np.full((len(player_ids), num_frames, 2), np.nan)
+        for player_index, player_id in enumerate(player_ids):
+            frame_nums = np.flatnonzero(present[player_index])
+            player_positions[player_index, frame_nums] = self.get_mini_court_coordinates_array(
+                foot_positions[player_index, frame_nums],
+                original_court_key_points,
+                max_heights[player_index, frame_nums],
+                np.full(len(frame_nums), player_heights[player_id]))
+
+        # The ball is scaled with the height of the player closest to it, on frames that have both
+        frame_nums = np.flatnonzero(frames_with_players & ~np.isnan(ball_positions).any(axis=1))
+        ball_player_index = closest_player_index[frame_nums]
+        ball_mini_court_positions = self.get_mini_court_coordinates_array(
+            ball_positions[frame_nums],
+            original_court_key_points,
+            max_heights[ball_player_index, frame_nums],
+            np.array([player_heights[player_ids[player_index]] for player_index in ball_player_index]))
+
+        output_player_boxes = [{} for _ in range(num_frames)]
+        for player_index, player_id in enumerate(player_ids):
+            for frame_num, position in zip(np.flatnonzero(present[player_index]).tolist(),
+                                           player_positions[player_index][present[player_index]].tolist()):
+                output_player_boxes[frame_num][player_id] = tuple(position)
+
+        output_ball_boxes = [{} for _ in range(num_frames)]
+        for frame_num, position in zip(frame_nums.tolist(), ball_mini_court_positions.tolist()):
+            output_ball_boxes[frame_num] = {1: tuple(position)}
 
         return output_player_boxes , output_ball_boxes
     
+    def get_court_projector(self, original_court_key_points):
+        return CourtProjector(original_court_key_points, self.drawing_key_points)
+
+    def project_bounding_boxes_to_mini_court(self, player_boxes, ball_boxes, original_court_key_points):
+        # Homography based replacement for convert_bounding_boxes_to_mini_court_coordinates
+        court_projector = self.get_court_projector(original_court_key_points)
+        return court_projector.project_detections(player_boxes, ball_boxes)
+
+    def project_bounding_boxes_to_mini_court_timeline(self, player_boxes, ball_boxes, court_timeline):
+        # One homography per court segment, frames without a visible court get no positions
+        output_player_boxes = [{} for _ in player_boxes]
+        output_ball_boxes = [{} for _ in ball_boxes]
+        for segment in court_timeline.segments:
+            if not segment['court_visible']:
+                continue
+            start, end = segment['start_frame'], segment['end_frame']
+            segment_players, segment_balls = self.project_bounding_boxes_to_mini_court(player_boxes[start:end],
+                                                                                       ball_boxes[start:end],
+                                                                                       segment['keypoints'])
+            output_player_boxes[start:start + len(segment_players)] = segment_players
+            output_ball_boxes[start:start + len(segment_balls)] = segment_balls
+        return output_player_boxes, output_ball_boxes
+
+    def draw_points(self, frame, positions, color=(0,255,0)):
+        for _, position in positions.items():
+            x,y = position
+            x= int(x)
+            y= int(y)
+            cv2.circle(frame, (x,y), 5, color, -1)
+        return frame
+
     def draw_points_on_mini_court(self,frames,postions, color=(0,255,0)):
         for frame_num, frame in enumerate(frames):
-            for _, position in postions[frame_num].items():
-                x,y = position
-                x= int(x)
-                y= int(y)
-                cv2.circle(frame, (x,y), 5, color, -1)
-        return frames
+            yield self.draw_points(frame, postions[frame_num], color)
 
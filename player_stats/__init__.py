@@ -0,0 +1 @@
+from .shot_stats import compute_shot_stats, ShotStatsTable, FrameStatsView
\ No newline at end of file
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('../')
+import constants
+from utils import convert_pixel_distance_to_meters, measure_distances
+
+
+def _positions_at(detections, frames, object_id):
+    # (len(frames), 2) mini court positions, NaN where the object is missing
+    positions = np.full((len(frames), 2), np.nan)
+    for index, frame_num in enumerate(frames):
+        position = detections[frame_num].get(object_id) if frame_num < len(detections) else None
+        if position is not None:
+            positions[index] = position[:2]
+    return positions
+
+
+def _last_value(values, mask):
+    # Value at the most recent row where mask is set, 0 before the first one
+    last_index = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    return np.where(last_index >= 0, values[np.maximum(last_index, 0)], 0.0)
+
+
+class FrameStatsView:
+    """Per-frame view of a ShotStatsTable.
+
+    Only an index from frame to the shot row in effect is stored; columns are
+    expanded on access, so the view costs one int array however many columns
+    are read.
+    """
+
+    def __init__(self, table, num_frames):
+        self.table = table
+        self.num_frames = num_frames
+        self.shot_index = np.searchsorted(table['frame_num'], np.arange(num_frames), side='right') - 1
+
+    def __len__(self):
+        return self.num_frames
+
+    @property
+    def columns(self):
+        return self.table.columns
+
+    def __getitem__(self, column):
+        return self.table[column][self.shot_index]
+
+    def to_dataframe(self):
+        frames_df = pd.DataFrame({column: self[column] for column in self.columns})
+        frames_df['frame_num'] = np.arange(self.num_frames)
+        return frames_df
+
+
+class ShotStatsTable:
+    """One row per shot plus a leading all-zero row at frame 0.
+
+    Columns are numpy arrays: frame_num and end_frame of the shot, hitter and
+    opponent player ids, shot_speed and opponent_speed in km/h, and for every
+    player the running player_{id}_* totals, last values and averages after
+    that shot.
+    """
+
+    def __init__(self, columns):
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._columns['frame_num'])
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+    def to_dataframe(self):
+        return pd.DataFrame(self._columns)
+
+    @classmethod
+    def from_dataframe(cls, shots_df):
+        return cls({column: shots_df[column].to_numpy() for column in shots_df.columns})
+
+    def frame_view(self, num_frames):
+        return FrameStatsView(self, num_frames)
+
+
+def compute_shot_stats(ball_shot_frames, player_mini_court_detections, ball_mini_court_detections,
+                       mini_court_width, fps, player_ids=(1, 2)):
+    """Shot speed, hitter and opponent speed for every shot, with running totals.
+
+    Each shot runs from one ball shot frame to the next. Its speed is the
+    ball's mini court displacement over that time, the hitter is the player
+    closest to the ball when it was hit, and the opponent's speed is their
+    displacement over the same interval. Shots where the ball or both players
+    are missing at the start or end are dropped; a missing opponent only drops
+    that player speed sample. Averages divide by the number of samples that
+    went into each total.
+
+    Only the shot frames are looked up in the detections, everything else is
+    array arithmetic over shots.
+    """
+    shot_frames = np.asarray(ball_shot_frames, dtype=np.int64)
+    start_frames = shot_frames[:-1]
+    end_frames = shot_frames[1:]
+    player_ids = np.asarray(player_ids)
+    meters_per_pixel = convert_pixel_distance_to_meters(1.0, constants.DOUBLE_LINE_WIDTH, mini_court_width)
+    shot_seconds = (end_frames - start_frames) / fps
+
+    ball_start = _positions_at(ball_mini_court_detections, start_frames, 1)
+    ball_end = _positions_at(ball_mini_court_detections, end_frames, 1)
+    # (shots, players, 2)
+    players_start = np.stack([_positions_at(player_mini_court_detections, start_frames, player_id)
+                              for player_id in player_ids], axis=1)
+    players_end = np.stack([_positions_at(player_mini_court_detections, end_frames, player_id)
+                            for player_id in player_ids], axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shot_speed = measure_distances(ball_end, ball_start) * meters_per_pixel / shot_seconds * 3.6
+
+        distance_to_ball = measure_distances(players_start, ball_start[:, None])
+        has_hitter = ~np.all(np.isnan(distance_to_ball), axis=1)
+        hitter_index = np.argmin(np.where(np.isnan(distance_to_ball), np.inf, distance_to_ball), axis=1)
+        # With two players the opponent is simply the other one
+        opponent_index = 1 - hitter_index
+
+        shot_rows = np.arange(len(start_frames))
+        opponent_distance = measure_distances(players_end[shot_rows, opponent_index], players_start[shot_rows, opponent_index])
+        opponent_speed = opponent_distance * meters_per_pixel / shot_seconds * 3.6
+
+    valid = has_hitter & np.isfinite(shot_speed)
+    columns = {
+        'frame_num': np.concatenate([[0], start_frames[valid]]),
+        'end_frame': np.concatenate([[0], end_frames[valid]]),
+        'hitter': np.concatenate([[0], player_ids[hitter_index[valid]]]),
+        'opponent': np.concatenate([[0], player_ids[opponent_index[valid]]]),
+        'shot_speed': np.concatenate([[0.0], shot_speed[valid]]),
+        'opponent_speed': np.concatenate([[0.0], opponent_speed[valid]]),
+    }
+
+    shot_speed = columns['shot_speed']
+    opponent_speed = columns['opponent_speed']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for player_id in player_ids:
+            hit = columns['hitter'] == player_id
+            ran = (columns['opponent'] == player_id) & np.isfinite(opponent_speed)
+            number_of_shots = np.cumsum(hit)
+            total_shot_speed = np.cumsum(np.where(hit, shot_speed, 0.0))
+            number_of_player_speeds = np.cumsum(ran)
+            total_player_speed = np.cumsum(np.where(ran, opponent_speed, 0.0))
+            columns[f'player_{player_id}_number_of_shots'] = number_of_shots
+            columns[f'player_{player_id}_total_shot_speed'] = total_shot_speed
+            columns[f'player_{player_id}_last_shot_speed'] = _last_value(shot_speed, hit)
+            columns[f'player_{player_id}_average_shot_speed'] = total_shot_speed / number_of_shots
+            columns[f'player_{player_id}_number_of_player_speeds'] = number_of_player_speeds
+            columns[f'player_{player_id}_total_player_speed'] = total_player_speed
+            columns[f'player_{player_id}_last_player_speed'] = _last_value(opponent_speed, ran)
+            columns[f'player_{player_id}_average_player_speed'] = total_player_speed / number_of_player_speeds
+
+    return ShotStatsTable(columns)
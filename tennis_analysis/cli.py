@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+import yaml
+from .config import load_config
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m tennis_analysis',
+                                     description="Tennis player, ball and court analysis")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_config_arguments(subparser):
+        subparser.add_argument('config', nargs='?', default=None,
+                               help="YAML or TOML run config, only the keys that differ from the defaults")
+        subparser.add_argument('--set', dest='overrides', action='append', default=[], metavar='SECTION.KEY=VALUE',
+                               help="override a config value, can be repeated (e.g. --set detection.workers=4)")
+        subparser.add_argument('--input', help="input video (input.video)")
+        subparser.add_argument('--output', help="output video (output.video)")
+        subparser.add_argument('--start-frame', type=int, help="first frame to process (input.start_frame)")
+        subparser.add_argument('--end-frame', type=int, help="frame to stop before (input.end_frame)")
+        subparser.add_argument('--workers', type=int, help="detection worker processes (detection.workers)")
+
+    run_parser = subparsers.add_parser('run', help="run the pipeline")
+    add_config_arguments(run_parser)
+    analyze_parser = subparsers.add_parser('analyze',
+                                           help="detection, court projection and stats only, written to "
+                                                "results.dir without drawing or encoding any video")
+    add_config_arguments(analyze_parser)
+    analyze_parser.add_argument('--results-dir', help="where to write the results (results.dir)")
+    render_parser = subparsers.add_parser('render', help="draw stored analyze results onto the source video")
+    render_parser.add_argument('results_dir', help="directory written by the analyze command")
+    add_config_arguments(render_parser)
+    show_parser = subparsers.add_parser('show-config', help="print the effective config as YAML")
+    add_config_arguments(show_parser)
+    return parser
+
+
+def config_from_args(args, overrides=()):
+    # Shortcut flags are applied after --set, so they win
+    overrides = list(overrides) + list(args.overrides)
+    shortcuts = [
+        ('input', 'video', args.input),
+        ('output', 'video', args.output),
+        ('input', 'start_frame', args.start_frame),
+        ('input', 'end_frame', args.end_frame),
+        ('detection', 'workers', args.workers),
+    ]
+    overrides += [{section: {key: value}} for section, key, value in shortcuts if value is not None]
+    return load_config(args.config, overrides)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    command_overrides = []
+    if args.command == 'analyze':
+        command_overrides.append({'stages': {'render': False, 'save_results': True}})
+        if args.results_dir is not None:
+            command_overrides.append({'results': {'dir': args.results_dir}})
+    elif args.command == 'render':
+        # Replay onto the video and frame range the results were computed from
+        summary_path = os.path.join(args.results_dir, 'summary.json')
+        if not os.path.exists(summary_path):
+            parser.error(f"{summary_path} not found, run the analyze command first")
+        with open(summary_path) as f:
+            summary = json.load(f)
+        command_overrides.append({'input': {key: summary[key] for key in ('video', 'start_frame', 'end_frame') if key in summary}})
+    try:
+        config = config_from_args(args, command_overrides)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    if args.command == 'show-config':
+        yaml.safe_dump(config, sys.stdout, sort_keys=False)
+        return 0
+
+    from .pipeline import run_pipeline, render_results
+    if args.command == 'render':
+        from .results import load_results
+        render_results(config, load_results(args.results_dir))
+        print(f"Wrote {config['output']['video']}")
+        return 0
+
+    run_pipeline(config)
+    return 0
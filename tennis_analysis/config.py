@@ -0,0 +1,143 @@
+import copy
+import os
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_config.yaml')
+
+RENDER_LAYERS = (
+    'player_bboxes',
+    'ball_bboxes',
+    'court_keypoints',
+    'mini_court',
+    'mini_court_players',
+    'mini_court_ball',
+    'player_stats',
+    'frame_number',
+)
+RESULTS_FORMATS = ('json', 'csv', 'parquet')
+
+# Numeric settings as (type, minimum); bools are not accepted as numbers
+NUMERIC_FIELDS = {
+    'input.start_frame': (int, 0),
+    'input.prefetch_buffer': (int, 1),
+    'input.window_size': (int, 1),
+    'detection.player_batch_size': (int, 1),
+    'detection.ball_batch_size': (int, 1),
+    'detection.workers': (int, 1),
+    'detection.overlap_frames': (int, 0),
+    'detection.player_detection_interval': (int, 1),
+    'detection.ball_conf': (float, 0),
+    'cache.max_bytes': (int, 0),
+    'court.scene_change_threshold': (float, 0),
+    'court.redetect_interval_seconds': (float, 0),
+    'players.max_distance_from_court': (float, 0),
+    'players.min_on_court_fraction': (float, 0),
+    'players.min_track_frames': (int, 0),
+    'shots.minimum_change_frames_for_hit': (int, 1),
+    'shots.rolling_window': (int, 1),
+}
+# Numeric settings that may also be null
+OPTIONAL_NUMERIC_FIELDS = {
+    'input.end_frame': (int, 0),
+    'output.fps': (float, 0),
+    'detection.player_motion_threshold': (float, 0),
+}
+
+
+def load_config_file(path):
+    """Read a YAML (.yaml/.yml) or TOML (.toml) file into a dict."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"Unsupported config format {extension!r}, expected .yaml, .yml or .toml")
+
+
+def default_config():
+    return load_config_file(DEFAULT_CONFIG_PATH)
+
+
+def merge_config(base, overrides, prefix=''):
+    """Recursively apply overrides onto a copy of base, rejecting unknown keys."""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        name = f"{prefix}{key}"
+        if key not in base:
+            raise ValueError(f"Unknown config key {name!r}")
+        if isinstance(base[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"Config key {name!r} is a section, got {value!r}")
+            merged[key] = merge_config(base[key], value, prefix=f"{name}.")
+        else:
+            merged[key] = value
+    return merged
+
+
+def parse_override(override):
+    """'detection.workers=4' -> {'detection': {'workers': 4}}, the value parsed as YAML."""
+    if '=' not in override:
+        raise ValueError(f"Override {override!r} must look like section.key=value")
+    dotted_key, raw_value = override.split('=', 1)
+    value = yaml.safe_load(raw_value) if raw_value else None
+    for key in reversed(dotted_key.strip().split('.')):
+        value = {key: value}
+    return value
+
+
+def _config_value(config, dotted_key):
+    value = config
+    for key in dotted_key.split('.'):
+        value = value[key]
+    return value
+
+
+def _validate_number(name, value, value_type, minimum):
+    accepted = (int,) if value_type is int else (int, float)
+    if isinstance(value, bool) or not isinstance(value, accepted):
+        expected = 'an integer' if value_type is int else 'a number'
+        raise ValueError(f"{name} must be {expected}, got {value!r}")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value!r}")
+
+
+def validate_config(config):
+    for name, (value_type, minimum) in NUMERIC_FIELDS.items():
+        _validate_number(name, _config_value(config, name), value_type, minimum)
+    for name, (value_type, minimum) in OPTIONAL_NUMERIC_FIELDS.items():
+        value = _config_value(config, name)
+        if value is not None:
+            _validate_number(name, value, value_type, minimum)
+    unknown_layers = [layer for layer in config['render']['layers'] if layer not in RENDER_LAYERS]
+    if unknown_layers:
+        raise ValueError(f"Unknown render layers {unknown_layers}, expected some of {list(RENDER_LAYERS)}")
+    if 'player_stats' in config['render']['layers'] and not config['stages']['stats']:
+        raise ValueError("render layer 'player_stats' needs stages.stats enabled")
+    if config['stages']['stats'] and not config['stages']['select_players']:
+        raise ValueError("stages.stats needs stages.select_players, stats are computed for players 1 and 2")
+    unknown_formats = [table_format for table_format in config['results']['formats'] if table_format not in RESULTS_FORMATS]
+    if unknown_formats:
+        raise ValueError(f"Unknown results formats {unknown_formats}, expected some of {list(RESULTS_FORMATS)}")
+
+
+def load_config(path=None, overrides=()):
+    """Defaults, then the config file at path (if any), then overrides.
+
+    Each override is a nested dict or a 'section.key=value' string.
+    """
+    config = default_config()
+    if path is not None:
+        config = merge_config(config, load_config_file(path))
+    for override in overrides:
+        if isinstance(override, str):
+            override = parse_override(override)
+        config = merge_config(config, override)
+    validate_config(config)
+    return config
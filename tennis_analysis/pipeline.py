@@ -0,0 +1,226 @@
+from utils import (PrefetchingFrameSource,
+                   DetectionCache,
+                   save_video,
+                   PlayerStatsRenderer,
+                   FrameCompositor,
+                   draw_frame_number
+                   )
+from trackers import PlayerTracker,BallTracker,detect_video_parallel
+from court_line_detector import CourtLineDetector, CourtTracker, CourtTimeline
+from mini_court import MiniCourt
+from player_stats import compute_shot_stats
+from .results import save_results
+
+
+def open_video(config):
+    video_config = config['input']
+    return PrefetchingFrameSource(video_config['video'],
+                                  buffer_size=video_config['prefetch_buffer'],
+                                  window_size=video_config['window_size'],
+                                  start_frame=video_config['start_frame'],
+                                  end_frame=video_config['end_frame'])
+
+
+def tracker_kwargs(config):
+    """PlayerTracker and BallTracker constructor arguments from the config."""
+    models = config['models']
+    detection = config['detection']
+    player_kwargs = {'model_path': models['player'],
+                     'batch_size': detection['player_batch_size'],
+                     'detection_interval': detection['player_detection_interval'],
+                     'motion_threshold': detection['player_motion_threshold']}
+    ball_kwargs = {'model_path': models['ball'],
+                   'batch_size': detection['ball_batch_size'],
+                   'conf': detection['ball_conf'],
+                   'roi_tracking': detection['ball_roi_tracking']}
+    return player_kwargs, ball_kwargs
+
+
+def create_trackers(config):
+    player_kwargs, ball_kwargs = tracker_kwargs(config)
+    return PlayerTracker(**player_kwargs), BallTracker(**ball_kwargs)
+
+
+def open_cache(config):
+    if not config['cache']['enabled']:
+        return None
+    return DetectionCache(cache_dir=config['cache']['dir'], max_bytes=config['cache']['max_bytes'])
+
+
+def detect(config, video_frames, player_tracker, ball_tracker):
+    detection = config['detection']
+    if detection['read_from_stub']:
+        player_detections = player_tracker.detect_frames(video_frames, read_from_stub=True, stub_path=detection['player_stub'])
+        ball_detections = ball_tracker.detect_frames(video_frames, read_from_stub=True, stub_path=detection['ball_stub'])
+        # Stubs hold the whole video from frame 0, keep the configured range
+        frame_range = slice(video_frames.start_frame, video_frames.end_frame)
+        player_detections, ball_detections = player_detections[frame_range], ball_detections[frame_range]
+        if len(player_detections) != len(video_frames) or len(ball_detections) != len(video_frames):
+            raise ValueError(f"Detection stubs do not cover frames {video_frames.start_frame} to {video_frames.end_frame}")
+    elif detection['workers'] > 1:
+        # Workers build their trackers from the same settings as create_trackers
+        player_kwargs, ball_kwargs = tracker_kwargs(config)
+        player_detections, ball_detections = detect_video_parallel(video_frames.video_path,
+                                                                   player_kwargs,
+                                                                   ball_kwargs,
+                                                                   num_workers=detection['workers'],
+                                                                   overlap_frames=detection['overlap_frames'],
+                                                                   start_frame=video_frames.start_frame,
+                                                                   end_frame=video_frames.end_frame,
+                                                                   cache=open_cache(config))
+    else:
+        cache = open_cache(config)
+        player_detections = player_tracker.detect_frames(video_frames, cache=cache)
+        ball_detections = ball_tracker.detect_frames(video_frames, cache=cache)
+    return player_detections, ball_detections
+
+
+def track_court(config, video_frames, court_line_detector):
+    court_config = config['court']
+    court_tracker = CourtTracker(court_line_detector,
+                                 fps=video_frames.fps,
+                                 scene_change_threshold=court_config['scene_change_threshold'],
+                                 redetect_interval_seconds=court_config['redetect_interval_seconds'])
+    if court_config['tracking']:
+        return court_tracker.track(video_frames)
+
+    # One detection on the first frame for the whole video
+    first_frame = video_frames.read_frame(0)
+    keypoints = court_line_detector.predict(first_frame)
+    return CourtTimeline([{'start_frame': 0,
+                           'end_frame': len(video_frames),
+                           'keypoints': keypoints,
+                           'court_visible': court_tracker.is_court(keypoints, first_frame.shape)}],
+                         len(video_frames))
+
+
+def analyze(config, video_frames, player_tracker, ball_tracker, court_line_detector):
+    """Detection, court tracking, player selection, shots, projection and stats.
+
+    Returns a dict with everything the renderer (or a results writer) needs.
+    """
+    stages = config['stages']
+    fps = config['output']['fps'] or video_frames.fps
+
+    # Detect Players and Ball
+    player_detections, ball_detections = detect(config, video_frames, player_tracker, ball_tracker)
+    if stages['smooth_ball']:
+        ball_detections = ball_tracker.smooth_ball_positions(ball_detections)
+
+    # Court keypoints per scene
+    court_timeline = track_court(config, video_frames, court_line_detector)
+    court_keypoints = court_timeline.first_visible_keypoints()
+    if court_keypoints is None:
+        court_keypoints = court_timeline.segments[0]['keypoints']
+
+    # choose players
+    if stages['select_players']:
+        player_detections = player_tracker.choose_and_filter_players(court_keypoints, player_detections,
+                                                                     court_visible=court_timeline.court_visible,
+                                                                     **config['players'])
+
+    # MiniCourt
+    mini_court = MiniCourt(video_frames.read_frame(0))
+
+    # Detect ball shots, skipping replays and close-ups that have no court to measure against
+    ball_shot_frames = ball_tracker.get_ball_shot_frames(ball_detections, **config['shots'])
+    court_visible = court_timeline.court_visible
+    ball_shot_frames = [frame_num for frame_num in ball_shot_frames
+                        if frame_num < len(court_visible) and court_visible[frame_num]]
+
+    # Convert positions to mini court positions
+    player_mini_court_detections, ball_mini_court_detections = mini_court.project_bounding_boxes_to_mini_court_timeline(player_detections,
+                                                                                                                        ball_detections,
+                                                                                                                        court_timeline)
+
+    shot_stats = None
+    if stages['stats']:
+        shot_stats = compute_shot_stats(ball_shot_frames,
+                                        player_mini_court_detections,
+                                        ball_mini_court_detections,
+                                        mini_court.get_width_of_mini_court(),
+                                        fps=video_frames.fps)
+
+    return {
+        'fps': fps,
+        'num_frames': len(player_detections),
+        'player_detections': player_detections,
+        'ball_detections': ball_detections,
+        'court_timeline': court_timeline,
+        'mini_court': mini_court,
+        'ball_shot_frames': ball_shot_frames,
+        'player_mini_court_detections': player_mini_court_detections,
+        'ball_mini_court_detections': ball_mini_court_detections,
+        'shot_stats': shot_stats,
+    }
+
+
+def build_compositor(config, results, player_tracker, ball_tracker, mini_court):
+    compositor = FrameCompositor(profile=config['render']['profile'])
+    for layer in config['render']['layers']:
+        if layer == 'player_bboxes':
+            compositor.add_detections_layer(player_tracker.draw_bbox, results['player_detections'], name=layer)
+        elif layer == 'ball_bboxes':
+            compositor.add_detections_layer(ball_tracker.draw_bbox, results['ball_detections'], name=layer)
+        elif layer == 'court_keypoints':
+            compositor.add_layer(CourtLineDetector.draw_court_timeline_frame, name=layer,
+                                 court_timeline=results['court_timeline'])
+        elif layer == 'mini_court':
+            compositor.add_frame_layer(mini_court.draw_overlay, name=layer)
+        elif layer == 'mini_court_players':
+            compositor.add_detections_layer(mini_court.draw_points, results['player_mini_court_detections'], name=layer)
+        elif layer == 'mini_court_ball':
+            compositor.add_detections_layer(mini_court.draw_points, results['ball_mini_court_detections'], name=layer,
+                                            color=(0,255,255))
+        elif layer == 'player_stats':
+            if results['shot_stats'] is None:
+                raise ValueError("render layer 'player_stats' needs shot stats in the results")
+            player_stats_per_frame = results['shot_stats'].frame_view(results['num_frames'])
+            compositor.add_layer(PlayerStatsRenderer(player_stats_per_frame).draw, name=layer)
+        elif layer == 'frame_number':
+            compositor.add_layer(draw_frame_number, name=layer)
+    return compositor
+
+
+def render(config, results, video_frames, player_tracker, ball_tracker, mini_court=None):
+    # Every layer is applied to a frame before the next frame is read, so each
+    # frame is decoded, annotated and written in a single pass.
+    if mini_court is None:
+        mini_court = MiniCourt(video_frames.read_frame(0))
+    compositor = build_compositor(config, results, player_tracker, ball_tracker, mini_court)
+    save_video(compositor.compose(video_frames), config['output']['video'],
+               fps=results['fps'], codec=config['output']['codec'])
+    if compositor.profile:
+        for name, seconds in compositor.layer_times.items():
+            print(f"{name:>20}: {seconds * 1000 / max(results['num_frames'], 1):.2f} ms/frame")
+    return compositor
+
+
+def render_results(config, results):
+    """Draw stored results (see results.load_results) onto the source video.
+
+    No model is loaded, the trackers are only used for their drawing methods.
+    """
+    video_frames = open_video(config)
+    player_tracker, ball_tracker = create_trackers(config)
+    return render(config, results, video_frames, player_tracker, ball_tracker)
+
+
+def run_pipeline(config):
+    """Analyze the configured video, then save results and/or render as the stages say."""
+    video_frames = open_video(config)
+    player_tracker, ball_tracker = create_trackers(config)
+    court_line_detector = CourtLineDetector(config['models']['court'], backend=config['models']['court_backend'])
+
+    results = analyze(config, video_frames, player_tracker, ball_tracker, court_line_detector)
+    if config['stages']['save_results']:
+        metadata = {'video': video_frames.video_path,
+                    'start_frame': video_frames.start_frame,
+                    'end_frame': video_frames.end_frame,
+                    'width': video_frames.width,
+                    'height': video_frames.height}
+        for path in save_results(results, config['results']['dir'], config['results']['formats'], metadata):
+            print(f"Wrote {path}")
+    if config['stages']['render']:
+        render(config, results, video_frames, player_tracker, ball_tracker, results['mini_court'])
+    return results
@@ -0,0 +1,144 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from court_line_detector import CourtTimeline
+from player_stats import ShotStatsTable
+from .config import RESULTS_FORMATS
+
+TRAJECTORY_COLUMNS = ['frame_num', 'object', 'object_id', 'x1', 'y1', 'x2', 'y2', 'mini_court_x', 'mini_court_y']
+
+
+def trajectories_table(results):
+    """Long table with one row per frame and tracked object.
+
+    Each row holds the video bounding box and the mini court position, either
+    of which is NaN when missing. object is 'player' or 'ball'.
+    """
+    rows = []
+    for object_name, detections, mini_court_detections in (
+            ('player', results['player_detections'], results['player_mini_court_detections']),
+            ('ball', results['ball_detections'], results['ball_mini_court_detections'])):
+        for frame_num, (detection_dict, mini_court_dict) in enumerate(zip(detections, mini_court_detections)):
+            for object_id in detection_dict.keys() | mini_court_dict.keys():
+                bbox = detection_dict.get(object_id)
+                position = mini_court_dict.get(object_id)
+                rows.append((frame_num, object_name, object_id,
+                             *(bbox[:4] if bbox is not None and len(bbox) == 4 else (np.nan,)*4),
+                             *(position[:2] if position is not None else (np.nan,)*2)))
+    trajectories_df = pd.DataFrame(rows, columns=TRAJECTORY_COLUMNS)
+    return trajectories_df.sort_values(['frame_num', 'object', 'object_id'], kind='stable', ignore_index=True)
+
+
+def _write_table(table_df, path_without_extension, table_format):
+    path = f"{path_without_extension}.{table_format}"
+    if table_format == 'csv':
+        table_df.to_csv(path, index=False)
+    elif table_format == 'json':
+        table_df.to_json(path, orient='records')
+    elif table_format == 'parquet':
+        try:
+            table_df.to_parquet(path, index=False)
+        except ImportError as e:
+            raise ImportError("Writing parquet results needs pyarrow or fastparquet") from e
+    return path
+
+
+def _read_table(path_without_extension):
+    # Prefer the formats that round-trip dtypes exactly
+    for table_format in ('parquet', 'csv', 'json'):
+        path = f"{path_without_extension}.{table_format}"
+        if not os.path.exists(path):
+            continue
+        if table_format == 'parquet':
+            return pd.read_parquet(path)
+        if table_format == 'csv':
+            return pd.read_csv(path)
+        return pd.read_json(path, orient='records')
+    raise FileNotFoundError(f"No results table at {path_without_extension}.{{parquet,csv,json}}")
+
+
+def save_results(results, results_dir, formats=('json', 'csv'), metadata=None):
+    """Write analysis results as structured files, returns the paths written.
+
+    summary.json always holds the run metadata, shot frames and court
+    timeline. The shots table (one row per shot, see ShotStatsTable) and the
+    per-frame trajectories table are written in each of formats.
+    """
+    unknown_formats = [table_format for table_format in formats if table_format not in RESULTS_FORMATS]
+    if unknown_formats:
+        raise ValueError(f"Unknown results formats {unknown_formats}, expected some of {list(RESULTS_FORMATS)}")
+    os.makedirs(results_dir, exist_ok=True)
+
+    court_timeline = results['court_timeline']
+    summary = {
+        **(metadata or {}),
+        'fps': results['fps'],
+        'num_frames': results['num_frames'],
+        'ball_shot_frames': [int(frame_num) for frame_num in results['ball_shot_frames']],
+        'court_segments': [{'start_frame': int(segment['start_frame']),
+                            'end_frame': int(segment['end_frame']),
+                            'keypoints': np.asarray(segment['keypoints'], dtype=float).tolist(),
+                            'court_visible': bool(segment['court_visible'])}
+                           for segment in court_timeline.segments],
+    }
+    summary_path = os.path.join(results_dir, 'summary.json')
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    paths = [summary_path]
+
+    tables = {'trajectories': trajectories_table(results)}
+    if results['shot_stats'] is not None:
+        tables['shots'] = results['shot_stats'].to_dataframe()
+    for name, table_df in tables.items():
+        for table_format in formats:
+            paths.append(_write_table(table_df, os.path.join(results_dir, name), table_format))
+    return paths
+
+
+def load_results(results_dir):
+    """Read save_results output back into the dict shape analyze returns.
+
+    mini_court is not stored, the renderer rebuilds it from the first frame.
+    Mini court positions that were NaN are left out.
+    """
+    with open(os.path.join(results_dir, 'summary.json')) as f:
+        summary = json.load(f)
+    num_frames = summary['num_frames']
+
+    trajectories_df = _read_table(os.path.join(results_dir, 'trajectories'))
+    detections = {'player': [{} for _ in range(num_frames)], 'ball': [{} for _ in range(num_frames)]}
+    mini_court_detections = {'player': [{} for _ in range(num_frames)], 'ball': [{} for _ in range(num_frames)]}
+    frame_nums = trajectories_df['frame_num'].to_numpy()
+    object_names = trajectories_df['object'].to_numpy()
+    object_ids = trajectories_df['object_id'].to_numpy()
+    bboxes = trajectories_df[['x1', 'y1', 'x2', 'y2']].to_numpy(dtype=float)
+    positions = trajectories_df[['mini_court_x', 'mini_court_y']].to_numpy(dtype=float)
+    has_bbox = ~np.isnan(bboxes).any(axis=1)
+    has_position = ~np.isnan(positions).any(axis=1)
+    for frame_num, object_name, object_id, bbox, position, bbox_found, position_found in zip(
+            frame_nums.tolist(), object_names.tolist(), object_ids.tolist(),
+            bboxes.tolist(), positions.tolist(), has_bbox.tolist(), has_position.tolist()):
+        if bbox_found:
+            detections[object_name][frame_num][object_id] = bbox
+        if position_found:
+            mini_court_detections[object_name][frame_num][object_id] = tuple(position)
+
+    shot_stats = None
+    if any(os.path.exists(os.path.join(results_dir, f"shots.{table_format}")) for table_format in RESULTS_FORMATS):
+        shot_stats = ShotStatsTable.from_dataframe(_read_table(os.path.join(results_dir, 'shots')))
+
+    court_segments = [{**segment, 'keypoints': np.asarray(segment['keypoints'], dtype=np.float32)}
+                      for segment in summary['court_segments']]
+    return {
+        'summary': summary,
+        'fps': summary['fps'],
+        'num_frames': num_frames,
+        'player_detections': detections['player'],
+        'ball_detections': detections['ball'],
+        'court_timeline': CourtTimeline(court_segments, num_frames),
+        'ball_shot_frames': summary['ball_shot_frames'],
+        'player_mini_court_detections': mini_court_detections['player'],
+        'ball_mini_court_detections': mini_court_detections['ball'],
+        'shot_stats': shot_stats,
+    }
@@ -1,2 +1,7 @@
 from .player_tracker import PlayerTracker
-from .ball_tracker import BallTracker
\ No newline at end of file
+from .ball_tracker import BallTracker
+from .parallel_detection import detect_video_parallel
+from .skip_frame_detection import skip_frame_detect, fill_detection_gaps
+from .ball_shot_detector import BallShotDetector
+from .ball_smoother import BallKalmanSmoother
+from .player_selection import select_players, score_tracks
\ No newline at end of file
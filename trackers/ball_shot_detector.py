@@ -0,0 +1,76 @@
+import math
+from collections import deque
+
+
+class BallShotDetector:
+    """Online counterpart of BallTracker.get_ball_shot_frames.
+
+    Feed one ball detection per frame to update(). A shot at frame i can only be
+    confirmed once the ball has kept its new direction for the following
+    int(minimum_change_frames_for_hit*1.2) frames, so update() reports it with a
+    fixed latency of that many frames (30 by default): the call for frame i+30
+    returns [i]. State is O(lookahead) regardless of stream length, and replaying
+    a recorded sequence gives exactly the frames of find_ball_shot_frames.
+    """
+
+    def __init__(self, minimum_change_frames_for_hit=25, rolling_window=5):
+        self.minimum_change_frames_for_hit = minimum_change_frames_for_hit
+        self.rolling_window = rolling_window
+        self.latency = int(minimum_change_frames_for_hit*1.2)
+        self.reset()
+
+    def reset(self):
+        self.frame_num = -1
+        self._mid_y_window = deque(maxlen=self.rolling_window)
+        self._last_rolling_mean = math.nan
+        # delta_y of frames [frame_num - latency, frame_num]
+        self._deltas = deque(maxlen=self.latency + 1)
+
+    def _rolling_mean(self):
+        # Summed oldest first, like the vectorized rolling_mean, so results match bit for bit
+        total = 0.0
+        count = 0
+        for value in self._mid_y_window:
+            if not math.isnan(value):
+                total += value
+                count += 1
+        return total / count if count else math.nan
+
+    def update(self, ball_dict):
+        """Add the next frame's {1: [x1, y1, x2, y2]} (or {} when missing).
+
+        Returns a list with the frame number of a confirmed shot, or [].
+        """
+        self.frame_num += 1
+        bbox = ball_dict.get(1) if ball_dict else None
+        mid_y = (bbox[1] + bbox[3]) / 2 if bbox is not None and len(bbox) == 4 else math.nan
+        self._mid_y_window.append(mid_y)
+
+        rolling_mean = self._rolling_mean()
+        self._deltas.append(rolling_mean - self._last_rolling_mean)
+        self._last_rolling_mean = rolling_mean
+
+        candidate = self.frame_num - self.latency
+        if candidate < 1:
+            return []
+
+        delta = self._deltas[0]
+        next_delta = self._deltas[1]
+        following = list(self._deltas)[1:]
+        if delta > 0 and next_delta < 0:
+            sustained = sum(1 for d in following if d < 0)
+        elif delta < 0 and next_delta > 0:
+            sustained = sum(1 for d in following if d > 0)
+        else:
+            return []
+
+        if sustained >= self.minimum_change_frames_for_hit:
+            return [candidate]
+        return []
+
+    def replay(self, ball_positions):
+        self.reset()
+        shot_frames = []
+        for ball_dict in ball_positions:
+            shot_frames.extend(self.update(ball_dict))
+        return shot_frames
@@ -0,0 +1,175 @@
+import numpy as np
+
+
+class BallKalmanSmoother:
+    """Constant-acceleration Kalman filter over the ball bounding box.
+
+    Each of x1, y1, x2, y2 is modelled as position/velocity/acceleration with
+    the same dynamics and the same observation pattern, so the four filters
+    share one 3x3 covariance and the state is a single (3, 4) array.
+
+    Frames without a detection are coasted: the acceleration estimate decays
+    by acceleration_decay per frame and the process noise is scaled up by
+    gap_process_noise_scale, so a gap does not carry a stale acceleration
+    forward and the next detection is trusted over the prediction. The filter
+    never bridges more than max_gap_frames missing frames.
+
+    Streaming: call update() once per frame with {1: bbox} or {} and get the
+    filtered box back. It returns {} until the first detection and again once
+    more than max_gap_frames frames have been missed, restarting at the next
+    detection. State is O(1).
+
+    Offline: smooth() filters from the first to the last detection and, with
+    rts=True, runs a Rauch-Tung-Striebel backward pass, so short gaps are
+    bridged by the motion model instead of straight lines. Longer gaps fall
+    back to linear interpolation between the detections on either side, and
+    bridged boxes are kept inside the range the detections cover. Frames
+    before the first or after the last detection get {}.
+    """
+
+    def __init__(self, process_noise=1.0, measurement_noise=4.0, dt=1.0, initial_variance=1e6,
+                 max_gap_frames=10, acceleration_decay=0.5, gap_process_noise_scale=10.0):
+        self.F = np.array([[1.0, dt, dt * dt / 2],
+                           [0.0, 1.0, dt],
+                           [0.0, 0.0, 1.0]])
+        jerk_gain = np.array([dt**3 / 6, dt * dt / 2, dt])
+        self.Q = process_noise * np.outer(jerk_gain, jerk_gain)
+        # Transition and noise while coasting through a frame without a detection
+        self.F_gap = self.F @ np.diag([1.0, 1.0, acceleration_decay])
+        self.Q_gap = self.Q * gap_process_noise_scale
+        self.R = measurement_noise
+        self.initial_variance = initial_variance
+        self.max_gap_frames = max_gap_frames
+        self.reset()
+
+    def reset(self):
+        self.x = np.zeros((3, 4))
+        self.P = np.eye(3) * self.initial_variance
+        self.initialized = False
+        self.missed_frames = 0
+        self.detected_min = None
+        self.detected_max = None
+
+    def _predict(self, detected=True):
+        F, Q = (self.F, self.Q) if detected else (self.F_gap, self.Q_gap)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+
+    def _correct(self, bbox):
+        innovation = np.asarray(bbox[:4], dtype=float) - self.x[0]
+        gain = self.P[:, 0] / (self.P[0, 0] + self.R)
+        self.x = self.x + np.outer(gain, innovation)
+        self.P = self.P - np.outer(gain, self.P[0])
+
+    def _initialize(self, bbox):
+        # Start at the detection with unknown velocity and acceleration
+        self.x = np.zeros((3, 4))
+        self.x[0] = bbox[:4]
+        self.P = np.diag([self.R, self.initial_variance, self.initial_variance])
+        self.initialized = True
+        self.missed_frames = 0
+
+    @staticmethod
+    def _measurement(ball_dict):
+        bbox = ball_dict.get(1) if ball_dict else None
+        if bbox is None or len(bbox) != 4:
+            return None
+        return bbox
+
+    def update(self, ball_dict):
+        bbox = self._measurement(ball_dict)
+        if bbox is None:
+            if not self.initialized:
+                return {}
+            self.missed_frames += 1
+            if self.missed_frames > self.max_gap_frames:
+                self.reset()
+                return {}
+            self._predict(detected=False)
+            # Coasted boxes stay inside the range detected so far
+            return {1: np.clip(self.x[0], self.detected_min, self.detected_max).tolist()}
+
+        bbox = np.asarray(bbox[:4], dtype=float)
+        if not self.initialized:
+            detected_min, detected_max = self.detected_min, self.detected_max
+            self._initialize(bbox)
+            # The detected range spans restarts after long gaps
+            self.detected_min, self.detected_max = detected_min, detected_max
+        else:
+            self._predict()
+            self._correct(bbox)
+            self.missed_frames = 0
+        self.detected_min = bbox if self.detected_min is None else np.minimum(self.detected_min, bbox)
+        self.detected_max = bbox if self.detected_max is None else np.maximum(self.detected_max, bbox)
+        return {1: self.x[0].tolist()}
+
+    @property
+    def velocity(self):
+        """Per-frame velocity of (x1, y1, x2, y2)."""
+        return self.x[1].copy()
+
+    def smooth(self, ball_positions, rts=True):
+        num_frames = len(ball_positions)
+        measurements = np.full((num_frames, 4), np.nan)
+        for frame_num, ball_dict in enumerate(ball_positions):
+            bbox = self._measurement(ball_dict)
+            if bbox is not None:
+                measurements[frame_num] = bbox[:4]
+        detected = ~np.isnan(measurements[:, 0])
+        detected_frames = np.flatnonzero(detected)
+        self.reset()
+        if len(detected_frames) == 0:
+            return [{} for _ in range(num_frames)]
+
+        # Only the span between the first and the last detection is filtered
+        first, last = detected_frames[0], detected_frames[-1]
+        span = last - first + 1
+        x_filtered = np.empty((span, 3, 4))
+        P_filtered = np.empty((span, 3, 3))
+        x_predicted = np.empty((span, 3, 4))
+        P_predicted = np.empty((span, 3, 3))
+        transitions = np.empty((span, 3, 3))
+
+        self._initialize(measurements[first])
+        x_filtered[0] = x_predicted[0] = self.x
+        P_filtered[0] = P_predicted[0] = self.P
+        transitions[0] = self.F
+        for index in range(1, span):
+            frame_detected = detected[first + index]
+            self._predict(frame_detected)
+            transitions[index] = self.F if frame_detected else self.F_gap
+            x_predicted[index] = self.x
+            P_predicted[index] = self.P
+            if frame_detected:
+                self._correct(measurements[first + index])
+            x_filtered[index] = self.x
+            P_filtered[index] = self.P
+
+        x_smoothed = x_filtered
+        if rts and span > 1:
+            x_smoothed = x_filtered.copy()
+            # Gains only depend on the covariances, so they are computed for all frames at once
+            smoother_gains = P_filtered[:-1] @ transitions[1:].transpose(0, 2, 1) @ np.linalg.inv(P_predicted[1:])
+            for index in range(span - 2, -1, -1):
+                x_smoothed[index] += smoother_gains[index] @ (x_smoothed[index + 1] - x_predicted[index + 1])
+        boxes = x_smoothed[:, 0].copy()
+
+        # Gaps longer than the filter may bridge are interpolated linearly between the detections
+        gap_starts = detected_frames[:-1]
+        gap_ends = detected_frames[1:]
+        for start, end in zip(gap_starts[gap_ends - gap_starts - 1 > self.max_gap_frames].tolist(),
+                              gap_ends[gap_ends - gap_starts - 1 > self.max_gap_frames].tolist()):
+            weights = (np.arange(start + 1, end) - start) / (end - start)
+            boxes[start + 1 - first:end - first] = (measurements[start] +
+                                                    weights[:, None] * (measurements[end] - measurements[start]))
+
+        # Bridged boxes never leave the range the detections cover
+        in_gap = ~detected[first:last + 1]
+        boxes[in_gap] = np.clip(boxes[in_gap],
+                                measurements[detected].min(axis=0),
+                                measurements[detected].max(axis=0))
+
+        output = [{} for _ in range(num_frames)]
+        for frame_num, bbox in enumerate(boxes.tolist(), start=first):
+            output[frame_num] = {1: bbox}
+        return output
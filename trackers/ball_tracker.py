@@ -1,11 +1,82 @@
-from ultralytics import YOLO 
 import cv2
-import pickle
+import numpy as np
 import pandas as pd
-
-class BallTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
+import sys
+sys.path.append('../')
+from utils import iter_frame_batches
+from .ball_smoother import BallKalmanSmoother
+from .yolo_detector import YoloDetector
+
+def rolling_mean(values, window):
+    # Trailing mean over the non-NaN values of the window, NaN when there are none
+    # (pandas rolling(window, min_periods=1).mean()). Windows are summed directly
+    # rather than through a running cumsum so rounding error does not build up.
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    sums = np.zeros(len(values))
+    counts = np.zeros(len(values), dtype=np.int64)
+    for shift in range(window - 1, -1, -1):
+        sums[shift:] += filled[:len(values) - shift]
+        counts[shift:] += valid[:len(values) - shift]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def find_ball_shot_frames(mid_y, minimum_change_frames_for_hit=25, rolling_window=5):
+    """Frames where the ball's vertical direction flips and then holds.
+
+    A hit is a sign flip of the smoothed vertical velocity at frame i that is
+    followed by at least minimum_change_frames_for_hit frames moving in the new
+    direction within the next int(minimum_change_frames_for_hit*1.2) frames.
+    """
+    mid_y = np.asarray(mid_y, dtype=float)
+    lookahead = int(minimum_change_frames_for_hit*1.2)
+    num_frames = len(mid_y)
+    if num_frames - lookahead <= 1:
+        return []
+
+    delta_y = np.full(num_frames, np.nan)
+    delta_y[1:] = np.diff(rolling_mean(mid_y, rolling_window))
+    moving_up = delta_y < 0
+    moving_down = delta_y > 0
+
+    # Frames i in [1, n - lookahead) whose next frame flips direction
+    i = np.arange(1, num_frames - lookahead)
+    up_flip = moving_down[i] & moving_up[i + 1]
+    down_flip = moving_up[i] & moving_down[i + 1]
+
+    # Frames in (i, i + lookahead] that keep the new direction, via cumulative sums
+    up_counts = np.concatenate(([0], np.cumsum(moving_up)))
+    down_counts = np.concatenate(([0], np.cumsum(moving_down)))
+    sustained_up = up_counts[i + lookahead + 1] - up_counts[i + 1]
+    sustained_down = down_counts[i + lookahead + 1] - down_counts[i + 1]
+
+    hits = (up_flip & (sustained_up >= minimum_change_frames_for_hit)) | \
+           (down_flip & (sustained_down >= minimum_change_frames_for_hit))
+    return i[hits].tolist()
+
+
+class BallTracker(YoloDetector):
+    def __init__(self,model_path, batch_size=8, conf=0.15, imgsz=640,
+                 roi_tracking=False, roi_size=320, roi_imgsz=320, max_roi_misses=5):
+        super().__init__(model_path)
+        self.batch_size = batch_size
+        self.conf = conf
+        self.imgsz = imgsz
+
+        # ROI tracking searches a roi_size crop around the predicted ball position,
+        # inferred at roi_imgsz (above roi_size upscales the crop), and goes back to
+        # full-frame search after max_roi_misses consecutive misses
+        self.roi_tracking = roi_tracking
+        self.roi_size = roi_size
+        self.roi_imgsz = roi_imgsz
+        self.max_roi_misses = max_roi_misses
+
+    def cache_params(self):
+        params = {'tracker': 'ball', 'conf': self.conf, 'imgsz': self.imgsz}
+        if self.roi_tracking:
+            params.update({'roi_size': self.roi_size, 'roi_imgsz': self.roi_imgsz, 'max_roi_misses': self.max_roi_misses})
+        return params
 
     def interpolate_ball_positions(self, ball_positions):
         ball_positions = [x.get(1,[]) for x in ball_positions]
@@ -20,78 +91,103 @@ class BallTracker:
 
         return ball_positions
 
-    def get_ball_shot_frames(self,ball_positions):
-        ball_positions = [x.get(1,[]) for x in ball_positions]
-        # convert the list into pandas dataframe
-        df_ball_positions = pd.DataFrame(ball_positions,columns=['x1','y1','x2','y2'])
-
-        df_ball_positions['ball_hit'] = 0
-
-        df_ball_positions['mid_y'] = (df_ball_positions['y1'] + df_ball_positions['y2'])/2
-        df_ball_positions['mid_y_rolling_mean'] = df_ball_positions['mid_y'].rolling(window=5, min_periods=1, center=False).mean()
-        df_ball_positions['delta_y'] = df_ball_positions['mid_y_rolling_mean'].diff()
-        minimum_change_frames_for_hit = 25
-        for i in range(1,len(df_ball_positions)- int(minimum_change_frames_for_hit*1.2) ):
-            negative_position_change = df_ball_positions['delta_y'].iloc[i] >0 and df_ball_positions['delta_y'].iloc[i+1] <0
-            positive_position_change = df_ball_positions['delta_y'].iloc[i] <0 and df_ball_positions['delta_y'].iloc[i+1] >0
-
-            if negative_position_change or positive_position_change:
-                change_count = 0 
-                for change_frame in range(i+1, i+int(minimum_change_frames_for_hit*1.2)+1):
-                    negative_position_change_following_frame = df_ball_positions['delta_y'].iloc[i] >0 and df_ball_positions['delta_y'].iloc[change_frame] <0
-                    positive_position_change_following_frame = df_ball_positions['delta_y'].iloc[i] <0 and df_ball_positions['delta_y'].iloc[change_frame] >0
-
-                    if negative_position_change and negative_position_change_following_frame:
-                        change_count+=1
-                    elif positive_position_change and positive_position_change_following_frame:
-                        change_count+=1
-            
-                if change_count>minimum_change_frames_for_hit-1:
-                    df_ball_positions['ball_hit'].iloc[i] = 1
-
-        frame_nums_with_ball_hits = df_ball_positions[df_ball_positions['ball_hit']==1].index.tolist()
+    def smooth_ball_positions(self, ball_positions, rts=True, process_noise=1.0, measurement_noise=4.0, max_gap_frames=10):
+        # Kalman/RTS alternative to interpolate_ball_positions that bridges gaps of up to
+        # max_gap_frames with the motion model; longer gaps are interpolated linearly and
+        # nothing is filled before the first or after the last detection
+        smoother = BallKalmanSmoother(process_noise=process_noise, measurement_noise=measurement_noise,
+                                      max_gap_frames=max_gap_frames)
+        return smoother.smooth(ball_positions, rts=rts)
 
-        return frame_nums_with_ball_hits
+    def get_ball_shot_frames(self,ball_positions, minimum_change_frames_for_hit=25, rolling_window=5):
+        mid_y = np.array([(x[1][1] + x[1][3]) / 2 if 1 in x and len(x[1]) == 4 else np.nan
+                          for x in ball_positions], dtype=float)
+        return find_ball_shot_frames(mid_y, minimum_change_frames_for_hit, rolling_window)
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def _detect_frames(self, frames):
         ball_detections = []
 
-        if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                ball_detections = pickle.load(f)
-            return ball_detections
+        if self.roi_tracking:
+            ball_detections = self.detect_frames_roi(frames)
+        else:
+            for batch in iter_frame_batches(frames, self.batch_size):
+                ball_detections.extend(self.detect_batch(batch))
 
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            ball_detections.append(player_dict)
-        
-        if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(ball_detections, f)
-        
         return ball_detections
 
     def detect_frame(self,frame):
-        results = self.model.predict(frame,conf=0.15)[0]
+        results = self.model.predict(frame,conf=self.conf, imgsz=self.imgsz, verbose=False)[0]
+        return self.results_to_ball_dict(results)
 
+    def detect_batch(self,frames):
+        # One predict call for the whole batch amortizes preprocessing and NMS setup
+        results = self.model.predict(list(frames), conf=self.conf, imgsz=self.imgsz, batch=len(frames), verbose=False)
+        return [self.results_to_ball_dict(frame_results) for frame_results in results]
+
+    def results_to_ball_dict(self,results, offset=(0, 0)):
         ball_dict = {}
         for box in results.boxes:
             result = box.xyxy.tolist()[0]
-            ball_dict[1] = result
+            ball_dict[1] = [result[0] + offset[0], result[1] + offset[1],
+                            result[2] + offset[0], result[3] + offset[1]]
         
         return ball_dict
 
+    def predict_ball_position(self, ball_history, frame_num):
+        # Constant-velocity prediction from the last two detections
+        if not ball_history:
+            return None
+        last_frame_num, last_center = ball_history[-1]
+        if len(ball_history) == 1:
+            return last_center
+        previous_frame_num, previous_center = ball_history[-2]
+        steps = (frame_num - last_frame_num) / (last_frame_num - previous_frame_num)
+        return (last_center[0] + (last_center[0] - previous_center[0]) * steps,
+                last_center[1] + (last_center[1] - previous_center[1]) * steps)
+
+    def detect_roi(self, frame, center):
+        frame_height, frame_width = frame.shape[:2]
+        crop_width = min(self.roi_size, frame_width)
+        crop_height = min(self.roi_size, frame_height)
+        x0 = int(min(max(center[0] - crop_width / 2, 0), frame_width - crop_width))
+        y0 = int(min(max(center[1] - crop_height / 2, 0), frame_height - crop_height))
+        crop = frame[y0:y0 + crop_height, x0:x0 + crop_width]
+
+        results = self.model.predict(crop, conf=self.conf, imgsz=self.roi_imgsz, verbose=False)[0]
+        return self.results_to_ball_dict(results, offset=(x0, y0))
+
+    def detect_frames_roi(self, frames):
+        ball_detections = []
+        ball_history = []
+        consecutive_misses = 0
+        for frame_num, frame in enumerate(frames):
+            predicted_center = self.predict_ball_position(ball_history, frame_num)
+            if predicted_center is not None and consecutive_misses < self.max_roi_misses:
+                ball_dict = self.detect_roi(frame, predicted_center)
+            else:
+                ball_dict = self.detect_frame(frame)
+
+            if ball_dict:
+                x1, y1, x2, y2 = ball_dict[1]
+                ball_history = ball_history[-1:] + [(frame_num, ((x1 + x2) / 2, (y1 + y2) / 2))]
+                consecutive_misses = 0
+            else:
+                consecutive_misses += 1
+            ball_detections.append(ball_dict)
+        return ball_detections
+
+    def draw_bbox(self, frame, ball_dict):
+        # Draw Bounding Boxes
+        for track_id, bbox in ball_dict.items():
+            x1, y1, x2, y2 = bbox
+            cv2.putText(frame, f"Ball ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
+        return frame
+
     def draw_bboxes(self,video_frames, player_detections):
-        output_video_frames = []
+        # Lazily annotate so frames can stream straight through to the writer
         for frame, ball_dict in zip(video_frames, player_detections):
-            # Draw Bounding Boxes
-            for track_id, bbox in ball_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Ball ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 255), 2)
-            output_video_frames.append(frame)
-        
-        return output_video_frames
+            yield self.draw_bbox(frame, ball_dict)
 
 
     
\ No newline at end of file
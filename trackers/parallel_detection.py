@@ -0,0 +1,183 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import sys
+sys.path.append('../')
+from utils import VideoFrameSource
+from .player_tracker import PlayerTracker
+from .ball_tracker import BallTracker
+
+# Per-process model instances, created once by _init_worker
+_worker_player_tracker = None
+_worker_ball_tracker = None
+
+
+def _init_worker(player_tracker_kwargs, ball_tracker_kwargs, torch_threads):
+    global _worker_player_tracker, _worker_ball_tracker
+    import torch
+    # Keep workers from oversubscribing the cores with intra-op threads
+    torch.set_num_threads(torch_threads)
+    _worker_player_tracker = PlayerTracker(**player_tracker_kwargs)
+    _worker_ball_tracker = BallTracker(**ball_tracker_kwargs)
+
+
+def _detect_segment(video_path, start_frame, end_frame, detect_players=True, detect_balls=True):
+    # Every segment starts with fresh tracker state, IDs are reconciled when stitching.
+    # The trackers' own detect_frames runs, so batch sizes, skip-frame player
+    # detection and ROI ball search apply exactly as in a sequential run.
+    _worker_player_tracker.reset_tracker()
+    frames = VideoFrameSource(video_path, start_frame=start_frame, end_frame=end_frame)
+    player_detections = _worker_player_tracker.detect_frames(frames) if detect_players else None
+    ball_detections = _worker_ball_tracker.detect_frames(frames) if detect_balls else None
+    return player_detections, ball_detections
+
+
+def split_into_segments(num_frames, num_segments, overlap):
+    """Return (start, keep_end, end) triples.
+
+    Frames [start, keep_end) are kept from a segment, [keep_end, end) is the
+    overlap with the next segment that is only used to match track IDs.
+    """
+    num_segments = max(1, min(num_segments, num_frames))
+    boundaries = np.linspace(0, num_frames, num_segments + 1).astype(int)
+    segments = []
+    for start, keep_end in zip(boundaries[:-1], boundaries[1:]):
+        end = min(num_frames, keep_end + overlap)
+        segments.append((int(start), int(keep_end), int(end)))
+    return segments
+
+
+def _bbox_iou(boxes_a, boxes_b):
+    x1 = np.maximum(boxes_a[:, 0], boxes_b[:, 0])
+    y1 = np.maximum(boxes_a[:, 1], boxes_b[:, 1])
+    x2 = np.minimum(boxes_a[:, 2], boxes_b[:, 2])
+    y2 = np.minimum(boxes_a[:, 3], boxes_b[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-9)
+
+
+def match_track_ids(previous_overlap, next_overlap, min_iou=0.5):
+    """Map track IDs of the next segment onto the previous segment's IDs.
+
+    Both arguments are the per-frame {track_id: bbox} dicts of the same overlap
+    frames. Pairs are scored by mean IoU over the frames where both IDs are
+    present and matched greedily, best first.
+    """
+    scores = {}
+    for previous_frame, next_frame in zip(previous_overlap, next_overlap):
+        if not previous_frame or not next_frame:
+            continue
+        previous_ids = list(previous_frame.keys())
+        next_ids = list(next_frame.keys())
+        previous_boxes = np.array([previous_frame[i] for i in previous_ids], dtype=float)
+        next_boxes = np.array([next_frame[i] for i in next_ids], dtype=float)
+        rows, cols = np.meshgrid(np.arange(len(previous_ids)), np.arange(len(next_ids)), indexing='ij')
+        ious = _bbox_iou(previous_boxes[rows.ravel()], next_boxes[cols.ravel()])
+        for row, col, iou in zip(rows.ravel(), cols.ravel(), ious):
+            key = (previous_ids[row], next_ids[col])
+            total, count = scores.get(key, (0.0, 0))
+            scores[key] = (total + iou, count + 1)
+
+    candidates = sorted(((total / count, previous_id, next_id)
+                         for (previous_id, next_id), (total, count) in scores.items()),
+                        reverse=True)
+    mapping = {}
+    used_previous = set()
+    for mean_iou, previous_id, next_id in candidates:
+        if mean_iou < min_iou:
+            break
+        if previous_id in used_previous or next_id in mapping:
+            continue
+        mapping[next_id] = previous_id
+        used_previous.add(previous_id)
+    return mapping
+
+
+def stitch_segments(segments, segment_results, min_iou=0.5):
+    player_detections = []
+    ball_detections = []
+    previous_tail = None
+    next_free_id = 1
+
+    for (start, keep_end, end), (segment_players, segment_balls) in zip(segments, segment_results):
+        keep = keep_end - start
+        if segment_balls is not None:
+            ball_detections.extend(segment_balls[:keep])
+        if segment_players is None:
+            continue
+
+        if previous_tail is None:
+            mapping = {}
+        else:
+            mapping = match_track_ids(previous_tail, segment_players[:len(previous_tail)], min_iou)
+
+        # IDs that were not matched to the previous segment become new global IDs
+        for frame in segment_players:
+            for track_id in frame:
+                if track_id not in mapping:
+                    mapping[track_id] = next_free_id
+                    next_free_id += 1
+        next_free_id = max([next_free_id] + [global_id + 1 for global_id in mapping.values()])
+
+        remapped = [{mapping[track_id]: bbox for track_id, bbox in frame.items()} for frame in segment_players]
+        player_detections.extend(remapped[:keep])
+        previous_tail = remapped[keep:]
+
+    return player_detections, ball_detections
+
+
+def detect_video_parallel(video_path,
+                          player_tracker_kwargs,
+                          ball_tracker_kwargs,
+                          num_workers=None,
+                          overlap_frames=48,
+                          start_frame=0,
+                          end_frame=None,
+                          cache=None):
+    """Run player and ball detection over time segments in a process pool.
+
+    Every worker builds PlayerTracker(**player_tracker_kwargs) and
+    BallTracker(**ball_tracker_kwargs) and runs their detect_frames over its
+    segments. Returns the same (player_detections, ball_detections) lists as
+    running the trackers sequentially over the video, with player track IDs
+    reconciled across segment boundaries.
+
+    With a DetectionCache, results for the whole range are looked up and
+    stored by this process only, so workers never write to the cache
+    concurrently. Entries are keyed on num_workers and overlap_frames as well,
+    since segmenting changes the track IDs.
+    """
+    num_workers = num_workers or os.cpu_count()
+    source = VideoFrameSource(video_path, start_frame=start_frame, end_frame=end_frame)
+    segments = split_into_segments(len(source), num_workers, overlap_frames)
+    torch_threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    cached = {'player': None, 'ball': None}
+    if cache is not None:
+        # Constructing a tracker does not load its model, these only provide the cache keys
+        trackers = {'player': PlayerTracker(**player_tracker_kwargs), 'ball': BallTracker(**ball_tracker_kwargs)}
+        segmenting = {'workers': num_workers, 'overlap_frames': overlap_frames}
+        cache_args = {name: (video_path, tracker.model_path, {**tracker.cache_params(), **segmenting}, source.start_frame)
+                      for name, tracker in trackers.items()}
+        cached = {name: cache.get(*cache_args[name], source.end_frame) for name in cached}
+        if cached['player'] is not None and cached['ball'] is not None:
+            return cached['player'], cached['ball']
+
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             initializer=_init_worker,
+                             initargs=(player_tracker_kwargs, ball_tracker_kwargs, torch_threads)) as executor:
+        futures = [executor.submit(_detect_segment, video_path, source.start_frame + start, source.start_frame + end,
+                                   cached['player'] is None, cached['ball'] is None)
+                   for start, _, end in segments]
+        segment_results = [future.result() for future in futures]
+    player_detections, ball_detections = stitch_segments(segments, segment_results)
+
+    detections = {'player': player_detections, 'ball': ball_detections}
+    for name in cached:
+        if cached[name] is not None:
+            detections[name] = cached[name]
+        elif cache is not None:
+            cache.put(*cache_args[name], source.end_frame, detections[name])
+    return detections['player'], detections['ball']
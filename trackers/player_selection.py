@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+import constants
+from utils import as_keypoint_array, get_foot_positions
+from court_line_detector.court_tracker import court_reference_points
+
+COURT_WIDTH = constants.DOUBLE_LINE_WIDTH
+COURT_LENGTH = constants.HALF_COURT_LINE_HEIGHT*2
+FAR_SIDE = 0
+NEAR_SIDE = 1
+
+
+def detections_to_arrays(player_detections):
+    # Flatten [{track_id: bbox}] into parallel frame / track / (N, 4) box arrays in one pass
+    frame_nums = []
+    track_ids = []
+    bboxes = []
+    for frame_num, player_dict in enumerate(player_detections):
+        for track_id, bbox in player_dict.items():
+            frame_nums.append(frame_num)
+            track_ids.append(track_id)
+            bboxes.append(bbox[:4])
+    return (np.asarray(frame_nums, dtype=np.int64),
+            np.asarray(track_ids),
+            np.asarray(bboxes, dtype=float).reshape(-1, 4))
+
+
+def project_to_court(points, court_keypoints):
+    """Image points to court metres, (0, 0) at the far left doubles corner."""
+    homography, _ = cv2.findHomography(as_keypoint_array(court_keypoints).astype(np.float32),
+                                       court_reference_points(), cv2.RANSAC, 5.0)
+    if homography is None:
+        raise ValueError("Could not fit a court homography from the given keypoints")
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+    if len(points) == 0:
+        return np.empty((0, 2))
+    return cv2.perspectiveTransform(points, homography).reshape(-1, 2)
+
+
+def distance_outside_court(court_points):
+    # Metres from the doubles court rectangle, 0 inside it
+    dx = np.maximum(np.maximum(-court_points[:, 0], court_points[:, 0] - COURT_WIDTH), 0)
+    dy = np.maximum(np.maximum(-court_points[:, 1], court_points[:, 1] - COURT_LENGTH), 0)
+    return np.hypot(dx, dy)
+
+
+def score_tracks(player_detections, court_keypoints, max_distance_from_court=4.0, court_visible=None):
+    """Score every track over the whole video.
+
+    Each detection's foot position is projected onto the court. A detection
+    counts as on court within max_distance_from_court metres of the doubles
+    lines, weighted down linearly with that distance, and a track's score is
+    the sum of its weights: time on court, with people standing around the
+    court (ball kids, line judges, the umpire) counting for less. Detections
+    on frames where court_visible (per frame bools, e.g.
+    CourtTimeline.court_visible) is False are never on court, the keypoints
+    say nothing about replays and close-ups.
+
+    Returns a dict of arrays: track_ids, score, num_frames, on_court_frames,
+    near_side_frames, first_frame and last_frame per track, plus the
+    per-detection frame_nums, track_index, bboxes, on_court and side.
+    """
+    frame_nums, track_ids, bboxes = detections_to_arrays(player_detections)
+    unique_track_ids, track_index = np.unique(track_ids, return_inverse=True)
+    num_tracks = len(unique_track_ids)
+
+    court_points = project_to_court(get_foot_positions(bboxes), court_keypoints)
+    distance = distance_outside_court(court_points)
+    weight = np.clip(1 - distance / max_distance_from_court, 0, 1)
+    if court_visible is not None:
+        court_visible = np.asarray(court_visible, dtype=bool)
+        in_range = frame_nums < len(court_visible)
+        weight[~in_range] = 0
+        weight[in_range] *= court_visible[frame_nums[in_range]]
+    on_court = weight > 0
+    side = np.where(court_points[:, 1] > COURT_LENGTH / 2, NEAR_SIDE, FAR_SIDE)
+
+    first_frame = np.full(num_tracks, np.iinfo(np.int64).max)
+    last_frame = np.full(num_tracks, -1)
+    np.minimum.at(first_frame, track_index, frame_nums)
+    np.maximum.at(last_frame, track_index, frame_nums)
+
+    return {
+        'track_ids': unique_track_ids,
+        'score': np.bincount(track_index, weights=weight, minlength=num_tracks),
+        'num_frames': np.bincount(track_index, minlength=num_tracks),
+        'on_court_frames': np.bincount(track_index, weights=on_court, minlength=num_tracks).astype(int),
+        'near_side_frames': np.bincount(track_index, weights=on_court & (side == NEAR_SIDE), minlength=num_tracks).astype(int),
+        'first_frame': first_frame,
+        'last_frame': last_frame,
+        'frame_nums': frame_nums,
+        'track_index': track_index,
+        'bboxes': bboxes,
+        'on_court': on_court,
+        'side': side,
+    }
+
+
+def _side_next_to(side_by_frame, first_frame, last_frame):
+    # Side of an identity at its closest known frame before first_frame, or else after last_frame
+    known = np.flatnonzero(side_by_frame >= 0)
+    before = known[known < first_frame]
+    if len(before):
+        return side_by_frame[before[-1]], first_frame - before[-1], True
+    after = known[known > last_frame]
+    if len(after):
+        return side_by_frame[after[0]], after[0] - last_frame, False
+    return -1, np.inf, False
+
+
+def select_players(player_detections, court_keypoints, max_distance_from_court=4.0,
+                   min_on_court_fraction=0.5, min_track_frames=10, max_overlap_frames=5,
+                   court_visible=None):
+    """Pick the two players over the whole video and merge their track IDs.
+
+    A track is a candidate when it was on court for at least
+    min_on_court_fraction of its own detections and for at least
+    min_track_frames frames, so short fragments left by ID switches are kept
+    however long the video is. Candidates are ranked by their score (see
+    score_tracks) per detection, how well they stayed on court rather than
+    how long they were tracked, so people standing next to the lines all
+    along rank below player fragments. The best candidate and the best one
+    that overlaps it in time seed the two player identities. Every other
+    candidate, in rank order, joins the identity it does not overlap with (up
+    to max_overlap_frames, for tracker hand-offs), preferring the one last
+    seen on the same side of the net. Candidates that overlap both players
+    are bystanders and dropped.
+
+    Player 1 is the one that starts on the near side of the net, like the
+    original single-frame selection on a broadcast camera. Returns
+    ([{1: bbox, 2: bbox}], {player_id: [track_ids]}).
+    """
+    num_frames = len(player_detections)
+    tracks = score_tracks(player_detections, court_keypoints, max_distance_from_court, court_visible)
+    track_index = tracks['track_index']
+
+    candidates = np.flatnonzero((tracks['on_court_frames'] >= min_on_court_fraction * tracks['num_frames']) &
+                                (tracks['on_court_frames'] >= min_track_frames))
+    mean_score = tracks['score'] / tracks['num_frames']
+    # Best mean score first, ties go to the longer track
+    candidates = candidates[np.lexsort((-tracks['score'][candidates], -mean_score[candidates]))]
+
+    # Detection indices per track, grouped once; a stable sort keeps each track in frame order
+    by_track = np.argsort(track_index, kind='stable')
+    track_detections = np.split(by_track, np.cumsum(tracks['num_frames'])[:-1])
+
+    # Seed with the best track and the best one that is on screen at the same time
+    order = candidates.tolist()
+    if order:
+        seed_present = np.zeros(num_frames, dtype=bool)
+        seed_present[tracks['frame_nums'][track_detections[order[0]]]] = True
+        for position, track in enumerate(order[1:], start=1):
+            if np.count_nonzero(seed_present[tracks['frame_nums'][track_detections[track]]]) > max_overlap_frames:
+                order.insert(1, order.pop(position))
+                break
+
+    # Only the (at most two) identities keep per-frame arrays, tracks are looked up by their frames
+    identities = []
+    for track in order:
+        detections = track_detections[track]
+        frames = tracks['frame_nums'][detections]
+
+        compatible = [identity for identity in identities
+                      if np.count_nonzero(identity['present'][frames]) <= max_overlap_frames]
+        if not compatible:
+            if len(identities) == 2:
+                continue
+            identity = {'track_ids': [], 'present': np.zeros(num_frames, dtype=bool),
+                        'side_by_frame': np.full(num_frames, -1, dtype=np.int8), 'detections': []}
+            identities.append(identity)
+        else:
+            sides = tracks['side'][detections[tracks['on_court'][detections]]]
+
+            def mismatch(identity):
+                identity_side, gap, before = _side_next_to(identity['side_by_frame'], frames[0], frames[-1])
+                if identity_side < 0 or len(sides) == 0:
+                    return (1, gap)
+                # Compare with the side at the end of the track that is closest to the identity
+                track_side = sides[0] if before else sides[-1]
+                return (int(identity_side != track_side), gap)
+
+            identity = min(compatible, key=mismatch)
+
+        identity['track_ids'].append(tracks['track_ids'][track].item())
+        # Frames the identity already covers keep its earlier, higher scoring track
+        new_detections = detections[~identity['present'][frames]]
+        identity['detections'].append(new_detections)
+        identity['present'][frames] = True
+        on_court_new = new_detections[tracks['on_court'][new_detections]]
+        identity['side_by_frame'][tracks['frame_nums'][on_court_new]] = tracks['side'][on_court_new]
+
+    def starts_near(identity):
+        known = np.flatnonzero(identity['side_by_frame'] >= 0)
+        return len(known) > 0 and identity['side_by_frame'][known[0]] == NEAR_SIDE
+    identities.sort(key=lambda identity: not starts_near(identity))
+
+    selected_player_detections = [{} for _ in range(num_frames)]
+    player_track_ids = {}
+    for player_id, identity in enumerate(identities, start=1):
+        player_track_ids[player_id] = identity['track_ids']
+        detections = np.concatenate(identity['detections'])
+        for frame_num, bbox in zip(tracks['frame_nums'][detections].tolist(), tracks['bboxes'][detections].tolist()):
+            selected_player_detections[frame_num][player_id] = bbox
+    return selected_player_detections, player_track_ids
@@ -1,36 +1,49 @@
-from ultralytics import YOLO 
 import cv2
-import pickle
 import sys
 sys.path.append('../')
-from utils import measure_distance, get_center_of_bbox
-
-class PlayerTracker:
-    def __init__(self,model_path):
-        self.model = YOLO(model_path)
-
-    def choose_and_filter_players(self, court_keypoints, player_detections):
-        player_detections_first_frame = player_detections[0]
-        chosen_player = self.choose_players(court_keypoints, player_detections_first_frame)
-        filtered_player_detections = []
-        for player_dict in player_detections:
-            filtered_player_dict = {track_id: bbox for track_id, bbox in player_dict.items() if track_id in chosen_player}
-            filtered_player_detections.append(filtered_player_dict)
+from utils import get_centers_of_bboxes, pairwise_distances, as_keypoint_array, iter_frame_batches
+from .skip_frame_detection import skip_frame_detect
+from .player_selection import select_players
+from .yolo_detector import YoloDetector
+
+class PlayerTracker(YoloDetector):
+    # model.track() falls back to this confidence when none is given
+    TRACK_CONF = 0.1
+
+    def __init__(self,model_path, batch_size=1, tracker_config='bytetrack.yaml', imgsz=640,
+                 detection_interval=1, motion_threshold=None):
+        super().__init__(model_path)
+        self.batch_size = batch_size
+        # detection_interval > 1 runs the detector on every Nth frame (sooner when
+        # motion exceeds motion_threshold pixels) and interpolates the frames between
+        self.detection_interval = detection_interval
+        self.motion_threshold = motion_threshold
+        self.tracker_config = tracker_config
+        self.imgsz = imgsz
+        self.tracker = None
+
+    def cache_params(self):
+        return {'tracker': 'player', 'conf': self.TRACK_CONF, 'imgsz': self.imgsz, 'tracker_config': self.tracker_config,
+                'detection_interval': self.detection_interval, 'motion_threshold': self.motion_threshold}
+
+    def choose_and_filter_players(self, court_keypoints, player_detections, max_distance_from_court=4.0,
+                                  min_on_court_fraction=0.5, min_track_frames=10, court_visible=None):
+        # Scored over every frame rather than frame 0, with fragmented track IDs
+        # merged, so the output is keyed by stable player ids 1 and 2
+        filtered_player_detections, _ = select_players(player_detections, court_keypoints,
+                                                       max_distance_from_court=max_distance_from_court,
+                                                       min_on_court_fraction=min_on_court_fraction,
+                                                       min_track_frames=min_track_frames,
+                                                       court_visible=court_visible)
         return filtered_player_detections
 
     def choose_players(self, court_keypoints, player_dict):
-        distances = []
-        for track_id, bbox in player_dict.items():
-            player_center = get_center_of_bbox(bbox)
-
-            min_distance = float('inf')
-            for i in range(0,len(court_keypoints),2):
-                court_keypoint = (court_keypoints[i], court_keypoints[i+1])
-                distance = measure_distance(player_center, court_keypoint)
-                if distance < min_distance:
-                    min_distance = distance
-            distances.append((track_id, min_distance))
-        
+        track_ids = list(player_dict.keys())
+        player_centers = get_centers_of_bboxes([player_dict[track_id] for track_id in track_ids])
+        # Distance from every player to its closest court keypoint, in one call
+        min_distances = pairwise_distances(player_centers, as_keypoint_array(court_keypoints)).min(axis=1)
+        distances = list(zip(track_ids, min_distances.tolist()))
+
         # sorrt the distances in ascending order
         distances.sort(key = lambda x: x[1])
         # Choose the first 2 tracks
@@ -38,26 +51,32 @@ class PlayerTracker:
         return chosen_players
 
 
-    def detect_frames(self,frames, read_from_stub=False, stub_path=None):
+    def _detect_frames(self, frames):
         player_detections = []
 
-        if read_from_stub and stub_path is not None:
-            with open(stub_path, 'rb') as f:
-                player_detections = pickle.load(f)
-            return player_detections
+        if self.detection_interval > 1:
+            player_detections, _ = skip_frame_detect(frames,
+                                                     self.detect_single_frame,
+                                                     self.detection_interval,
+                                                     self.motion_threshold)
+        elif self.batch_size > 1:
+            for batch in iter_frame_batches(frames, self.batch_size):
+                player_detections.extend(self.detect_batch(batch))
+        else:
+            for frame in frames:
+                player_dict = self.detect_frame(frame)
+                player_detections.append(player_dict)
 
-        for frame in frames:
-            player_dict = self.detect_frame(frame)
-            player_detections.append(player_dict)
-        
-        if stub_path is not None:
-            with open(stub_path, 'wb') as f:
-                pickle.dump(player_detections, f)
-        
         return player_detections
 
+    def detect_single_frame(self,frame):
+        # Goes through the same tracker as the configured (batched or per-frame) path
+        if self.batch_size > 1:
+            return self.detect_batch([frame])[0]
+        return self.detect_frame(frame)
+
     def detect_frame(self,frame):
-        results = self.model.track(frame, persist=True)[0]
+        results = self.model.track(frame, persist=True, imgsz=self.imgsz)[0]
         id_name_dict = results.names
 
         player_dict = {}
@@ -71,17 +90,63 @@ class PlayerTracker:
         
         return player_dict
 
+    def reset_tracker(self):
+        # Forget track state so the next frames start with fresh IDs
+        self.tracker = None
+        if self._model is not None:
+            self._model.predictor = None
+
+    def create_tracker(self):
+        # Same construction as ultralytics' on_predict_start callback used by model.track().
+        # Imported here because these modules moved in ultralytics 8.1, and only the
+        # batched path needs them; the per-frame path runs on older versions too.
+        try:
+            from ultralytics.trackers.track import TRACKER_MAP
+            from ultralytics.utils import IterableSimpleNamespace, yaml_load
+            from ultralytics.utils.checks import check_yaml
+        except ImportError as e:
+            raise ImportError("Batched player tracking (batch_size > 1) needs ultralytics>=8.1") from e
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(self.tracker_config)))
+        return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=30)
+
+    def detect_batch(self,frames):
+        # Detection runs batched, association runs per frame in order on a single
+        # persistent tracker, mirroring model.track(persist=True) so IDs match the
+        # per-frame path.
+        if self.tracker is None:
+            self.tracker = self.create_tracker()
+
+        batch_results = self.model.predict(list(frames), conf=self.TRACK_CONF, imgsz=self.imgsz, batch=len(frames), verbose=False)
+
+        player_dicts = []
+        for frame, results in zip(frames, batch_results):
+            id_name_dict = results.names
+            player_dict = {}
+
+            det = results.boxes.cpu().numpy()
+            if len(det) > 0:
+                tracks = self.tracker.update(det, frame)
+                # tracks rows are [x1, y1, x2, y2, track_id, score, cls, det_index]
+                for track in tracks:
+                    object_cls_name = id_name_dict[int(track[6])]
+                    if object_cls_name == "person":
+                        player_dict[int(track[4])] = track[:4].tolist()
+
+            player_dicts.append(player_dict)
+        return player_dicts
+
+    def draw_bbox(self, frame, player_dict):
+        # Draw Bounding Boxes
+        for track_id, bbox in player_dict.items():
+            x1, y1, x2, y2 = bbox
+            cv2.putText(frame, f"Player ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+        return frame
+
     def draw_bboxes(self,video_frames, player_detections):
-        output_video_frames = []
+        # Lazily annotate so frames can stream straight through to the writer
         for frame, player_dict in zip(video_frames, player_detections):
-            # Draw Bounding Boxes
-            for track_id, bbox in player_dict.items():
-                x1, y1, x2, y2 = bbox
-                cv2.putText(frame, f"Player ID: {track_id}",(int(bbox[0]),int(bbox[1] -10 )),cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
-            output_video_frames.append(frame)
-        
-        return output_video_frames
+            yield self.draw_bbox(frame, player_dict)
 
 
     
\ No newline at end of file
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+def _estimated_motion(previous_keyframe, last_keyframe, keyframe_gap, frames_ahead):
+    # Largest box-corner displacement expected after frames_ahead frames at the current velocity
+    motion = 0.0
+    for track_id, bbox in last_keyframe.items():
+        if track_id not in previous_keyframe:
+            continue
+        velocity = (np.asarray(bbox) - np.asarray(previous_keyframe[track_id])) / keyframe_gap
+        motion = max(motion, float(np.abs(velocity).max()) * frames_ahead)
+    return motion
+
+
+def fill_detection_gaps(keyframe_detections, num_frames):
+    """Expand {frame_num: {track_id: bbox}} keyframes into a full per-frame list.
+
+    Tracks seen on both sides of a gap are linearly interpolated, tracks that
+    disappear are held at their last box until the next keyframe, and frames
+    after the last keyframe extrapolate at the last observed velocity.
+    """
+    keyframes = sorted(keyframe_detections)
+    detections = [{} for _ in range(num_frames)]
+    for frame_num in keyframes:
+        detections[frame_num] = dict(keyframe_detections[frame_num])
+
+    for start, end in zip(keyframes[:-1], keyframes[1:]):
+        start_dict = keyframe_detections[start]
+        end_dict = keyframe_detections[end]
+        for track_id, start_bbox in start_dict.items():
+            start_bbox = np.asarray(start_bbox, dtype=float)
+            end_bbox = np.asarray(end_dict.get(track_id, start_bbox), dtype=float)
+            weights = (np.arange(start + 1, end) - start) / (end - start)
+            boxes = start_bbox + weights[:, None] * (end_bbox - start_bbox)
+            for frame_num, bbox in zip(range(start + 1, end), boxes.tolist()):
+                detections[frame_num][track_id] = bbox
+
+    if keyframes:
+        last = keyframes[-1]
+        last_dict = keyframe_detections[last]
+        previous = keyframes[-2] if len(keyframes) > 1 else None
+        for track_id, last_bbox in last_dict.items():
+            last_bbox = np.asarray(last_bbox, dtype=float)
+            velocity = np.zeros(4)
+            if previous is not None and track_id in keyframe_detections[previous]:
+                velocity = (last_bbox - np.asarray(keyframe_detections[previous][track_id])) / (last - previous)
+            steps = np.arange(1, num_frames - last)
+            boxes = last_bbox + steps[:, None] * velocity
+            for frame_num, bbox in zip(range(last + 1, num_frames), boxes.tolist()):
+                detections[frame_num][track_id] = bbox
+
+    return detections
+
+
+def skip_frame_detect(frames, detect_fn, detection_interval=5, motion_threshold=None):
+    """Run detect_fn on a subset of frames and interpolate the rest.
+
+    The detector runs at least every detection_interval frames. With a
+    motion_threshold (pixels), it also runs as soon as the tracked boxes are
+    expected to have moved further than that since the last detection, so fast
+    rallies fall back towards full rate while static stretches are skipped.
+
+    Returns (detections, keyframes).
+    """
+    keyframe_detections = {}
+    keyframes = []
+    num_frames = 0
+    for frame_num, frame in enumerate(frames):
+        num_frames += 1
+        run_detector = not keyframes or frame_num - keyframes[-1] >= detection_interval
+        if not run_detector and motion_threshold is not None and len(keyframes) > 1:
+            frames_ahead = frame_num - keyframes[-1]
+            motion = _estimated_motion(keyframe_detections[keyframes[-2]],
+                                       keyframe_detections[keyframes[-1]],
+                                       keyframes[-1] - keyframes[-2],
+                                       frames_ahead)
+            run_detector = motion > motion_threshold
+
+        if run_detector:
+            keyframe_detections[frame_num] = detect_fn(frame)
+            keyframes.append(frame_num)
+
+    return fill_detection_gaps(keyframe_detections, num_frames), keyframes
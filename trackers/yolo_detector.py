@@ -0,0 +1,45 @@
+from ultralytics import YOLO
+import pickle
+
+
+class YoloDetector:
+    """Model loading, stubs and caching shared by PlayerTracker and BallTracker.
+
+    Subclasses implement cache_params(), the inference settings that change
+    their output, and _detect_frames(frames), the detection loop itself.
+    """
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._model = None
+
+    @property
+    def model(self):
+        # Loaded on first use so detection cache hits never load the weights
+        if self._model is None:
+            self._model = YOLO(self.model_path)
+        return self._model
+
+    def cache_params(self):
+        raise NotImplementedError
+
+    def _detect_frames(self, frames):
+        raise NotImplementedError
+
+    def detect_frames(self, frames, read_from_stub=False, stub_path=None, cache=None):
+        if read_from_stub and stub_path is not None:
+            with open(stub_path, 'rb') as f:
+                return pickle.load(f)
+
+        # Content-addressed cache, only possible when frames come from a video file
+        if cache is not None and hasattr(frames, 'video_path'):
+            return cache.get_or_detect(frames, self.model_path, self.cache_params(),
+                                       lambda: self._detect_and_save(frames, stub_path))
+        return self._detect_and_save(frames, stub_path)
+
+    def _detect_and_save(self, frames, stub_path=None):
+        detections = self._detect_frames(frames)
+        if stub_path is not None:
+            with open(stub_path, 'wb') as f:
+                pickle.dump(detections, f)
+        return detections
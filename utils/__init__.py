@@ -1,4 +1,9 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_of_bbox, measure_distance, get_foot_position,get_closest_keypoint_index,get_height_of_bbox,measure_xy_distance,get_center_of_bbox
+from .video_utils import read_video, save_video, get_video_metadata, VideoFrameSource, PrefetchingFrameSource, VideoWriter, iter_frame_batches
+from .bbox_utils import get_center_of_bbox, measure_distance, get_foot_position,get_closest_keypoint_index,get_height_of_bbox,measure_xy_distance
+from .bbox_utils import (as_keypoint_array, get_centers_of_bboxes, get_foot_positions, get_heights_of_bboxes,
+                         measure_distances, measure_xy_distances, pairwise_distances, get_closest_keypoint_indices)
 from .conversions import convert_pixel_distance_to_meters, convert_meters_to_pixel_distance
-from .player_stats_drawer_utils import draw_player_stats
\ No newline at end of file
+from .player_stats_drawer_utils import draw_player_stats, PlayerStatsRenderer
+from .detection_cache import DetectionCache, hash_file
+from .detection_store import DetectionStore, DETECTION_DTYPE
+from .frame_compositor import FrameCompositor, draw_frame_number
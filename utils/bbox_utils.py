@@ -1,3 +1,5 @@
+import numpy as np
+
 def get_center_of_bbox(bbox):
     x1, y1, x2, y2 = bbox
     center_x = int((x1 + x2) / 2)
@@ -19,7 +21,7 @@ def get_closest_keypoint_index(point, keypoints, keypoint_indices):
        if distance<closest_distance:
            closest_distance = distance
            key_point_ind = keypoint_indix
-    
+
    return key_point_ind
 
 def get_height_of_bbox(bbox):
@@ -28,5 +30,43 @@ def get_height_of_bbox(bbox):
 def measure_xy_distance(p1,p2):
     return abs(p1[0]-p2[0]), abs(p1[1]-p2[1])
 
-def get_center_of_bbox(bbox):
-    return (int((bbox[0]+bbox[2])/2),int((bbox[1]+bbox[3])/2))
\ No newline at end of file
+
+# Array counterparts of the functions above. Boxes are (..., 4) arrays of
+# x1, y1, x2, y2 and points (..., 2) arrays; keypoints can be the flat 28-value
+# detector output or a (14, 2) array. Missing boxes can be passed as NaN rows,
+# the NaNs just propagate. Centers and feet are truncated like the int() in
+# the single-box versions, so results match them exactly.
+
+def as_keypoint_array(keypoints):
+    return np.asarray(keypoints, dtype=float).reshape(-1, 2)
+
+def get_centers_of_bboxes(bboxes):
+    bboxes = np.asarray(bboxes, dtype=float)
+    return np.trunc(np.stack([(bboxes[..., 0] + bboxes[..., 2]) / 2, (bboxes[..., 1] + bboxes[..., 3]) / 2], axis=-1))
+
+def get_foot_positions(bboxes):
+    bboxes = np.asarray(bboxes, dtype=float)
+    return np.stack([np.trunc((bboxes[..., 0] + bboxes[..., 2]) / 2), bboxes[..., 3]], axis=-1)
+
+def get_heights_of_bboxes(bboxes):
+    bboxes = np.asarray(bboxes, dtype=float)
+    return bboxes[..., 3] - bboxes[..., 1]
+
+def measure_distances(points_a, points_b):
+    # Element-wise, with numpy broadcasting between the two point arrays
+    difference = np.asarray(points_a, dtype=float) - np.asarray(points_b, dtype=float)
+    return np.sqrt(difference[..., 0]**2 + difference[..., 1]**2)
+
+def measure_xy_distances(points_a, points_b):
+    return np.abs(np.asarray(points_a, dtype=float) - np.asarray(points_b, dtype=float))
+
+def pairwise_distances(points_a, points_b):
+    # (N, 2) and (M, 2) points to an (N, M) distance matrix
+    return measure_distances(np.asarray(points_a, dtype=float)[:, None], np.asarray(points_b, dtype=float)[None])
+
+def get_closest_keypoint_indices(points, keypoints, keypoint_indices):
+    # Closest by vertical distance like get_closest_keypoint_index, first one wins ties
+    keypoint_indices = np.asarray(keypoint_indices)
+    candidate_ys = as_keypoint_array(keypoints)[keypoint_indices, 1]
+    points = np.asarray(points, dtype=float)
+    return keypoint_indices[np.argmin(np.abs(points[..., 1:2] - candidate_ys), axis=-1)]
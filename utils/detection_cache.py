@@ -0,0 +1,165 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+from .detection_store import DetectionStore
+
+
+def hash_file(path, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class DetectionCache:
+    """On-disk detection cache keyed by content rather than by file path.
+
+    An entry is identified by the hash of the video bytes, the hash of the model
+    weights and the inference parameters, plus the frame range it covers. A
+    lookup for a frame range is served from any set of entries that together
+    cover it, so partial and segmented runs are reusable, except for player
+    detections: every run numbers its track IDs afresh, so those are only
+    served from a single entry that covers the whole range. Entries are
+    memory-mapped DetectionStore directories, and least recently used entries
+    are evicted once the cache grows past max_bytes.
+
+    Content hashes of large files are remembered in hashes.json, keyed by path,
+    size and mtime, so a video is only read in full the first time it is seen.
+    """
+
+    def __init__(self, cache_dir='tracker_cache', max_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hash_index_path = os.path.join(cache_dir, 'hashes.json')
+        self._hash_index = self._load_hash_index()
+
+    def _load_hash_index(self):
+        if not os.path.exists(self._hash_index_path):
+            return {}
+        with open(self._hash_index_path) as f:
+            return json.load(f)
+
+    def content_hash(self, path):
+        stat = os.stat(path)
+        index_key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        if index_key not in self._hash_index:
+            self._hash_index[index_key] = hash_file(path)
+            with open(self._hash_index_path, 'w') as f:
+                json.dump(self._hash_index, f)
+        return self._hash_index[index_key]
+
+    def base_key(self, video_path, model_path, params):
+        # Weights that are not on disk yet (ultralytics downloads them when the
+        # model loads) have no content to key on, there is no key until they are
+        if not os.path.exists(video_path) or not os.path.exists(model_path):
+            return None
+        key_data = json.dumps({
+            'video': self.content_hash(video_path),
+            'model': self.content_hash(model_path),
+            'params': params,
+            'store_format': DetectionStore.FORMAT_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(key_data.encode()).hexdigest()[:32]
+
+    def _entry_path(self, base_key, start_frame, end_frame):
+        return os.path.join(self.cache_dir, f"{base_key}_{start_frame}_{end_frame}")
+
+    def _entries(self, base_key):
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, f"{base_key}_*_*")):
+            if not os.path.isdir(path) or path.endswith('.tmp'):
+                continue
+            _, start_frame, end_frame = os.path.basename(path).rsplit('_', 2)
+            entries.append((int(start_frame), int(end_frame), path))
+        return entries
+
+    def _plan(self, entries, start_frame, end_frame, join=True):
+        if not join:
+            covering = [entry for entry in entries if entry[0] <= start_frame and entry[1] >= end_frame]
+            if not covering:
+                return None
+            # The tightest entry, least to slice away
+            return [min(covering, key=lambda entry: entry[1] - entry[0])]
+
+        # Greedily chain entries that cover [start_frame, end_frame), preferring the longest reach
+        plan = []
+        position = start_frame
+        while position < end_frame:
+            candidates = [entry for entry in entries if entry[0] <= position < entry[1]]
+            if not candidates:
+                return None
+            best = max(candidates, key=lambda entry: entry[1])
+            plan.append(best)
+            position = best[1]
+        return plan
+
+    def get(self, video_path, model_path, params, start_frame, end_frame):
+        base_key = self.base_key(video_path, model_path, params)
+        if base_key is None:
+            return None
+        # Track IDs of separate player runs refer to different people, those entries are never joined
+        join = params.get('tracker') != 'player'
+        plan = self._plan(self._entries(base_key), start_frame, end_frame, join=join)
+        if plan is None:
+            return None
+
+        stores = []
+        position = start_frame
+        for entry_start, entry_end, path in plan:
+            stop = min(entry_end, end_frame)
+            stores.append(DetectionStore.load(path).slice_frames(position - entry_start, stop - entry_start))
+            position = stop
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+        if len(stores) == 1:
+            return stores[0]
+        return DetectionStore.concatenate(stores)
+
+    def put(self, video_path, model_path, params, start_frame, end_frame, detections):
+        base_key = self.base_key(video_path, model_path, params)
+        if base_key is None:
+            return
+        path = self._entry_path(base_key, start_frame, end_frame)
+        if not isinstance(detections, DetectionStore):
+            detections = DetectionStore.from_detections(detections, start_frame)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        detections.save(tmp_path)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_detect(self, frames, model_path, params, detect):
+        """Detections for frames (a VideoFrameSource) from the cache, else from detect().
+
+        Lookup and store both use the requested range frames.start_frame to
+        frames.end_frame. A container that reports more frames than it decodes
+        makes detect() return fewer detections; they are still stored under the
+        requested range, so the same request is a hit next time. Missing
+        weights are a miss; detect() loads (or downloads) the model and the
+        result is stored if the weights are on disk by then.
+        """
+        cache_args = (frames.video_path, model_path, params, frames.start_frame, frames.end_frame)
+        detections = self.get(*cache_args)
+        if detections is None:
+            detections = detect()
+            self.put(*cache_args, detections)
+        return detections
+
+    @staticmethod
+    def _entry_size(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def evict(self):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        entries = sorted((path for path in entries if os.path.isdir(path)), key=os.path.getmtime)
+        sizes = {path: self._entry_size(path) for path in entries}
+        total_bytes = sum(sizes.values())
+        while entries and total_bytes > self.max_bytes:
+            path = entries.pop(0)
+            total_bytes -= sizes[path]
+            shutil.rmtree(path)
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('frame', '<i4'),
+    ('track_id', '<i4'),
+    ('x1', '<f4'),
+    ('y1', '<f4'),
+    ('x2', '<f4'),
+    ('y2', '<f4'),
+])
+
+
+class DetectionStore:
+    """Columnar detections for a run of consecutive frames.
+
+    records is a structured array (DETECTION_DTYPE) sorted by frame, and
+    frame_offsets[i]:frame_offsets[i+1] are the rows of the i-th frame, so the
+    store also behaves like the [{track_id: [x1, y1, x2, y2]}, ...] list the
+    trackers produce. Saved stores are a directory holding the records as a
+    .npy file that is memory-mapped on load plus a small index, so opening a
+    full match costs milliseconds until frames are actually read.
+    """
+
+    # Bumped whenever DETECTION_DTYPE changes, so caches never mix layouts
+    FORMAT_VERSION = 2
+    RECORDS_FILE = 'detections.npy'
+    INDEX_FILE = 'index.npz'
+
+    def __init__(self, records, frame_offsets, start_frame=0):
+        self.records = records
+        self.frame_offsets = frame_offsets
+        self.start_frame = start_frame
+
+    @classmethod
+    def from_detections(cls, detections, start_frame=0):
+        counts = np.fromiter((len(frame_dict) for frame_dict in detections), dtype=np.int64, count=len(detections))
+        frame_offsets = np.zeros(len(detections) + 1, dtype=np.int64)
+        np.cumsum(counts, out=frame_offsets[1:])
+
+        records = np.empty(frame_offsets[-1], dtype=DETECTION_DTYPE)
+        records['frame'] = np.repeat(np.arange(start_frame, start_frame + len(detections)), counts)
+        rows = [(track_id, *bbox[:4]) for frame_dict in detections for track_id, bbox in frame_dict.items()]
+        if rows:
+            rows = np.asarray(rows, dtype=np.float64)
+            records['track_id'] = rows[:, 0]
+            for column, name in enumerate(('x1', 'y1', 'x2', 'y2'), start=1):
+                records[name] = rows[:, column]
+        return cls(records, frame_offsets, start_frame)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        records = np.load(os.path.join(path, cls.RECORDS_FILE), mmap_mode=mmap_mode)
+        with np.load(os.path.join(path, cls.INDEX_FILE)) as index:
+            return cls(records, index['frame_offsets'], int(index['start_frame']))
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        base = self.frame_offsets[0]
+        np.save(os.path.join(path, self.RECORDS_FILE), np.ascontiguousarray(self.records[base:self.frame_offsets[-1]]))
+        np.savez(os.path.join(path, self.INDEX_FILE), frame_offsets=self.frame_offsets - base, start_frame=self.start_frame)
+
+    @classmethod
+    def concatenate(cls, stores):
+        stores = list(stores)
+        records = np.concatenate([store.records[store.frame_offsets[0]:store.frame_offsets[-1]] for store in stores])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        total = 0
+        for store in stores:
+            offsets.append(store.frame_offsets[1:] - store.frame_offsets[0] + total)
+            total += store.frame_offsets[-1] - store.frame_offsets[0]
+        start_frame = stores[0].start_frame if stores else 0
+        return cls(records, np.concatenate(offsets), start_frame)
+
+    def slice_frames(self, start, end):
+        # A view sharing the (possibly memory-mapped) records, nothing is copied
+        return DetectionStore(self.records, self.frame_offsets[start:end + 1], self.start_frame + start)
+
+    def frame_records(self, frame_index):
+        return self.records[self.frame_offsets[frame_index]:self.frame_offsets[frame_index + 1]]
+
+    def __len__(self):
+        return len(self.frame_offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self.slice_frames(start, max(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return {int(row[1]): [float(row[2]), float(row[3]), float(row[4]), float(row[5])]
+                for row in self.frame_records(index).tolist()}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_detections(self):
+        return list(self)
+
+    def bbox_track(self, track_id):
+        """(num_frames, 4) float array of one track's boxes, NaN where it is missing."""
+        boxes = np.full((len(self), 4), np.nan)
+        rows = self.records[self.frame_offsets[0]:self.frame_offsets[-1]]
+        rows = rows[rows['track_id'] == track_id]
+        frame_index = rows['frame'] - self.start_frame
+        for column, name in enumerate(('x1', 'y1', 'x2', 'y2')):
+            boxes[frame_index, column] = rows[name]
+        return boxes
@@ -0,0 +1,71 @@
+import time
+import cv2
+
+
+def draw_frame_number(frame, frame_num):
+    # Draw frame number on top left corner
+    return cv2.putText(frame, f"Frame: {frame_num}",(10,30),cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+
+class FrameCompositor:
+    """Applies a stack of annotation layers to each frame in one pass.
+
+    A layer is any callable taking (frame, frame_num) that draws into the frame
+    in place and returns it. Layers run in the order they were added, so every
+    frame is annotated completely while it is still hot in cache and then
+    handed on, instead of each drawing stage sweeping the whole video in turn.
+    compose() is a generator, so it sits between a frame source and a
+    VideoWriter without ever holding more than one frame.
+
+    With profile=True the time spent in each layer is accumulated in
+    layer_times, keyed by layer name.
+    """
+
+    def __init__(self, profile=False):
+        self.layers = []
+        self.profile = profile
+        self.layer_times = {}
+
+    def add_layer(self, draw_fn, name=None, **kwargs):
+        """draw_fn(frame, frame_num, **kwargs) on every frame."""
+        name = name or getattr(draw_fn, '__name__', f"layer_{len(self.layers)}")
+        self.layers.append((name, lambda frame, frame_num: draw_fn(frame, frame_num, **kwargs)))
+        return self
+
+    def add_frame_layer(self, draw_fn, name=None, **kwargs):
+        """draw_fn(frame, **kwargs), the same drawing on every frame."""
+        name = name or getattr(draw_fn, '__name__', f"layer_{len(self.layers)}")
+        self.layers.append((name, lambda frame, frame_num: draw_fn(frame, **kwargs)))
+        return self
+
+    def add_detections_layer(self, draw_fn, per_frame_values, name=None, **kwargs):
+        """draw_fn(frame, per_frame_values[frame_num], **kwargs).
+
+        Frames past the end of per_frame_values are left untouched.
+        """
+        name = name or getattr(draw_fn, '__name__', f"layer_{len(self.layers)}")
+        num_values = len(per_frame_values)
+
+        def layer(frame, frame_num):
+            if frame_num >= num_values:
+                return frame
+            return draw_fn(frame, per_frame_values[frame_num], **kwargs)
+
+        self.layers.append((name, layer))
+        return self
+
+    def composite(self, frame, frame_num):
+        if not self.profile:
+            for _, layer in self.layers:
+                frame = layer(frame, frame_num)
+            return frame
+
+        for name, layer in self.layers:
+            start = time.perf_counter()
+            frame = layer(frame, frame_num)
+            self.layer_times[name] = self.layer_times.get(name, 0.0) + time.perf_counter() - start
+        return frame
+
+    def compose(self, frames):
+        for frame_num, frame in enumerate(frames):
+            yield self.composite(frame, frame_num)
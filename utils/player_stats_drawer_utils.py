@@ -1,58 +1,111 @@
 import numpy as np
 import cv2
 
-def draw_player_stats(output_video_frames,player_stats):
+STATS_COLUMNS = [
+    'player_1_last_shot_speed',
+    'player_2_last_shot_speed',
+    'player_1_last_player_speed',
+    'player_2_last_player_speed',
+    'player_1_average_shot_speed',
+    'player_2_average_shot_speed',
+    'player_1_average_player_speed',
+    'player_2_average_player_speed',
+]
+
+def put_player_stats_text(image, stats_values, start_x, start_y):
+    (player_1_shot_speed, player_2_shot_speed,
+     player_1_speed, player_2_speed,
+     avg_player_1_shot_speed, avg_player_2_shot_speed,
+     avg_player_1_speed, avg_player_2_speed) = stats_values
+
+    text = "     Player 1     Player 2"
+    cv2.putText(image, text, (start_x+80, start_y+30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    text = "Shot Speed"
+    cv2.putText(image, text, (start_x+10, start_y+80), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{player_1_shot_speed:.1f} km/h    {player_2_shot_speed:.1f} km/h"
+    cv2.putText(image, text, (start_x+130, start_y+80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    text = "Player Speed"
+    cv2.putText(image, text, (start_x+10, start_y+120), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{player_1_speed:.1f} km/h    {player_2_speed:.1f} km/h"
+    cv2.putText(image, text, (start_x+130, start_y+120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    text = "avg. S. Speed"
+    cv2.putText(image, text, (start_x+10, start_y+160), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{avg_player_1_shot_speed:.1f} km/h    {avg_player_2_shot_speed:.1f} km/h"
+    cv2.putText(image, text, (start_x+130, start_y+160), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    text = "avg. P. Speed"
+    cv2.putText(image, text, (start_x+10, start_y+200), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    text = f"{avg_player_1_speed:.1f} km/h    {avg_player_2_speed:.1f} km/h"
+    cv2.putText(image, text, (start_x+130, start_y+200), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    return image
+
 
-    for index, row in player_stats.iterrows():
-        player_1_shot_speed = row['player_1_last_shot_speed']
-        player_2_shot_speed = row['player_2_last_shot_speed']
-        player_1_speed = row['player_1_last_player_speed']
-        player_2_speed = row['player_2_last_player_speed']
+class PlayerStatsRenderer:
+    """Draws the player stats panel into a frame in place.
 
-        avg_player_1_shot_speed = row['player_1_average_shot_speed']
-        avg_player_2_shot_speed = row['player_2_average_shot_speed']
-        avg_player_1_speed = row['player_1_average_player_speed']
-        avg_player_2_speed = row['player_2_average_player_speed']
+    The stats are read once into a (frames, 8) numpy array. The text layer is
+    only re-rendered when the values change (on shot frames); every other frame
+    just darkens the panel ROI and blends the cached anti-aliased text pixels
+    in, which matches drawing the text directly to within one intensity level.
+    """
 
-        frame = output_video_frames[index]
-        shapes = np.zeros_like(frame, np.uint8)
+    WIDTH = 350
+    HEIGHT = 230
+    # Text may overhang the dark box slightly, so it is rendered on a padded tile
+    TEXT_MARGIN = 20
 
-        width=350
-        height=230
+    def __init__(self, player_stats):
+        # Works with a per-frame DataFrame or a FrameStatsView
+        self.stats_values = np.column_stack([np.asarray(player_stats[column], dtype=float) for column in STATS_COLUMNS])
+        self._cached_key = None
+        self._text_ys = None
+        self._text_xs = None
+        self._black = np.zeros((self.HEIGHT + 1, self.WIDTH + 1, 3), np.uint8)
 
+    def panel_position(self, frame):
         start_x = frame.shape[1]-400
         start_y = frame.shape[0]-500
-        end_x = start_x+width
-        end_y = start_y+height
-
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (start_x, start_y), (end_x, end_y), (0, 0, 0), -1)
-        alpha = 0.5 
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-        output_video_frames[index] = frame
-
-        text = "     Player 1     Player 2"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+80, start_y+30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        
-        text = "Shot Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+80), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{player_1_shot_speed:.1f} km/h    {player_2_shot_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+130, start_y+80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-
-        text = "Player Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+120), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{player_1_speed:.1f} km/h    {player_2_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+130, start_y+120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-        
-        
-        text = "avg. S. Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+160), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{avg_player_1_shot_speed:.1f} km/h    {avg_player_2_shot_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+130, start_y+160), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-        
-        text = "avg. P. Speed"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+10, start_y+200), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
-        text = f"{avg_player_1_speed:.1f} km/h    {avg_player_2_speed:.1f} km/h"
-        output_video_frames[index] = cv2.putText(output_video_frames[index], text, (start_x+130, start_y+200), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-    
-    return output_video_frames
+        return start_x, start_y
+
+    def render_text(self, stats_values, start_x, start_y, frame_shape):
+        # The text is white, so drawn on black each pixel holds its coverage (0-255)
+        margin = self.TEXT_MARGIN
+        tile_shape = (self.HEIGHT + 2*margin, self.WIDTH + 2*margin, 3)
+        coverage = put_player_stats_text(np.zeros(tile_shape, np.uint8), stats_values, margin, margin)[:, :, 0]
+        text_ys, text_xs = np.nonzero(coverage)
+        text_coverage = coverage[text_ys, text_xs].astype(np.int32)[:, None]
+
+        text_ys = text_ys + start_y - margin
+        text_xs = text_xs + start_x - margin
+        inside = (text_ys >= 0) & (text_ys < frame_shape[0]) & (text_xs >= 0) & (text_xs < frame_shape[1])
+        self._text_ys = text_ys[inside]
+        self._text_xs = text_xs[inside]
+        self._text_coverage = text_coverage[inside]
+
+    def draw(self, frame, frame_num):
+        if frame_num >= len(self.stats_values):
+            return frame
+        stats_values = self.stats_values[frame_num]
+        start_x, start_y = self.panel_position(frame)
+
+        # Keyed on the displayed text, so NaN rows and sub-0.1 changes hit the cache too
+        key = (tuple(f"{value:.1f}" for value in stats_values), start_x, start_y, frame.shape)
+        if key != self._cached_key:
+            self.render_text(stats_values, start_x, start_y, frame.shape)
+            self._cached_key = key
+
+        # Darken the box to 50%, like blending with a filled black rectangle
+        roi = frame[max(start_y, 0):start_y+self.HEIGHT+1, max(start_x, 0):start_x+self.WIDTH+1]
+        cv2.addWeighted(self._black[:roi.shape[0], :roi.shape[1]], 0.5, roi, 0.5, 0, dst=roi)
+        background = frame[self._text_ys, self._text_xs].astype(np.int32)
+        frame[self._text_ys, self._text_xs] = background + ((255 - background) * self._text_coverage + 127) // 255
+        return frame
+
+
+def draw_player_stats(output_video_frames,player_stats):
+    renderer = PlayerStatsRenderer(player_stats)
+    for frame_num, frame in enumerate(output_video_frames):
+        yield renderer.draw(frame, frame_num)
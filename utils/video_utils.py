@@ -1,4 +1,12 @@
+import os
 import cv2
+import time
+import queue
+import shutil
+import threading
+import subprocess
+from collections import deque
+import numpy as np
 
 def read_video(video_path):
     cap = cv2.VideoCapture(video_path)
@@ -11,9 +19,342 @@ def read_video(video_path):
     cap.release()
     return frames
 
-def save_video(output_video_frames, output_video_path):
-    fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-    out = cv2.VideoWriter(output_video_path, fourcc, 24, (output_video_frames[0].shape[1], output_video_frames[0].shape[0]))
-    for frame in output_video_frames:
-        out.write(frame)
-    out.release()
\ No newline at end of file
+def get_video_metadata(video_path):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    metadata = {
+        'fps': cap.get(cv2.CAP_PROP_FPS) or 24,
+        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    cap.release()
+    return metadata
+
+
+def iter_frame_batches(frames, batch_size):
+    # Streaming sources know how to hand out windows whose buffers stay valid
+    if hasattr(frames, 'iter_windows'):
+        yield from frames.iter_windows(batch_size)
+        return
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class VideoFrameSource:
+    """Lazy, re-iterable frame source backed by cv2.VideoCapture.
+
+    Every iteration opens its own capture and decodes one frame at a time, so
+    several passes (detection, rendering) can run over the same video without
+    ever holding it in memory. Consumers that need several frames at once use
+    iter_windows(), which keeps at most window_size frames alive.
+    """
+
+    def __init__(self, video_path, window_size=32, start_frame=0, end_frame=None):
+        self.video_path = video_path
+        self.window_size = window_size
+
+        metadata = get_video_metadata(video_path)
+        self.fps = metadata['fps']
+        self.width = metadata['width']
+        self.height = metadata['height']
+        self.total_frame_count = metadata['frame_count']
+
+        self.start_frame = start_frame
+        if end_frame is None or end_frame > self.total_frame_count:
+            end_frame = self.total_frame_count
+        self.end_frame = end_frame
+
+    def __len__(self):
+        return max(0, self.end_frame - self.start_frame)
+
+    @property
+    def resolution(self):
+        return (self.width, self.height)
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.video_path)
+        if self.start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        return cap
+
+    def __iter__(self):
+        cap = self._open()
+        try:
+            for _ in range(len(self)):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            cap.release()
+
+    def iter_windows(self, window_size=None):
+        window_size = window_size or self.window_size
+        window = []
+        for frame in self:
+            window.append(frame)
+            if len(window) == window_size:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def read_frame(self, frame_num=0):
+        cap = cv2.VideoCapture(self.video_path)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame + frame_num)
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise IndexError(f"Frame {frame_num} is out of range for {self.video_path}")
+        return frame
+
+
+class PrefetchingFrameSource(VideoFrameSource):
+    """VideoFrameSource that decodes ahead on a worker thread.
+
+    Frames are decoded into a preallocated ring of numpy buffers that is reused
+    for the whole video, so no array is allocated per frame. A yielded frame is
+    only valid until the consumer asks for the next one (or, for iter_windows,
+    until the next window is requested); copy it if it has to outlive that.
+
+    After (or during) an iteration, self.stats holds:
+        frames              frames handed to the consumer
+        consumer_wait_s     time the consumer waited for decode (decode-bound)
+        producer_wait_s     time the decoder waited for a free buffer (inference-bound)
+        max_queue_depth     most decoded frames waiting at once
+        mean_queue_depth    average decoded frames waiting when one was taken
+    """
+
+    def __init__(self, video_path, buffer_size=8, window_size=32, start_frame=0, end_frame=None):
+        super().__init__(video_path, window_size=window_size, start_frame=start_frame, end_frame=end_frame)
+        self.buffer_size = buffer_size
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'frames': 0,
+            'consumer_wait_s': 0.0,
+            'producer_wait_s': 0.0,
+            'max_queue_depth': 0,
+            'mean_queue_depth': 0.0,
+        }
+
+    def __iter__(self):
+        return self._iter_prefetched(hold=1)
+
+    def iter_windows(self, window_size=None):
+        window_size = window_size or self.window_size
+        window = []
+        for frame in self._iter_prefetched(hold=window_size):
+            window.append(frame)
+            if len(window) == window_size:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    def _decode_worker(self, ring, free_slots, filled_slots, stop_event):
+        cap = self._open()
+        try:
+            for _ in range(len(self)):
+                wait_start = time.perf_counter()
+                slot = None
+                while slot is None:
+                    if stop_event.is_set():
+                        return
+                    try:
+                        slot = free_slots.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                self.stats['producer_wait_s'] += time.perf_counter() - wait_start
+
+                ret, frame = cap.read(ring[slot])
+                if not ret:
+                    break
+                if frame is not ring[slot]:
+                    # Decoder returned a differently shaped frame, adopt it as the slot buffer
+                    ring[slot] = frame
+                filled_slots.put(slot)
+        except Exception as e:
+            filled_slots.put(e)
+        finally:
+            cap.release()
+            filled_slots.put(None)
+
+    def _iter_prefetched(self, hold):
+        self.stats = self._empty_stats()
+        ring_size = self.buffer_size + hold
+        ring = [np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(ring_size)]
+        free_slots = queue.Queue()
+        for slot in range(ring_size):
+            free_slots.put(slot)
+        filled_slots = queue.Queue()
+        stop_event = threading.Event()
+
+        worker = threading.Thread(target=self._decode_worker,
+                                  args=(ring, free_slots, filled_slots, stop_event),
+                                  daemon=True)
+        worker.start()
+
+        in_use = deque()
+        depth_total = 0
+        try:
+            while True:
+                depth = filled_slots.qsize()
+                wait_start = time.perf_counter()
+                slot = filled_slots.get()
+                self.stats['consumer_wait_s'] += time.perf_counter() - wait_start
+                if slot is None:
+                    break
+                if isinstance(slot, Exception):
+                    raise slot
+
+                self.stats['frames'] += 1
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], depth)
+                depth_total += depth
+                self.stats['mean_queue_depth'] = depth_total / self.stats['frames']
+
+                yield ring[slot]
+
+                # The consumer is done with frames older than the last `hold` ones
+                in_use.append(slot)
+                while len(in_use) >= hold:
+                    free_slots.put(in_use.popleft())
+        finally:
+            stop_event.set()
+            worker.join()
+
+
+class VideoWriter:
+    """Streaming video writer that encodes on a background thread.
+
+    Frames passed to write() are queued (copied by default, since streaming
+    sources reuse their buffers) and encoded by a worker, so rendering and
+    encoding overlap with the rest of the pipeline. The frame size is taken
+    from the first frame.
+
+    codec is one of:
+        'MJPG'    cv2 Motion-JPEG (large files, what save_video always used)
+        'mp4v'    cv2 MPEG-4 part 2
+        'ffmpeg'  pipe raw frames to an ffmpeg subprocess encoding H.264
+        'auto'    ffmpeg if it is on PATH, else mp4v for .mp4 and MJPG otherwise
+    """
+
+    CODECS = ('MJPG', 'mp4v', 'ffmpeg', 'auto')
+
+    def __init__(self, output_video_path, fps=24, codec='MJPG', queue_size=16, copy_frames=True):
+        if codec not in self.CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {self.CODECS}")
+        if codec == 'auto':
+            codec = self.resolve_auto_codec(output_video_path)
+        if codec == 'ffmpeg' and shutil.which('ffmpeg') is None:
+            raise RuntimeError("codec='ffmpeg' requested but no ffmpeg executable is on PATH")
+
+        os.makedirs(os.path.dirname(output_video_path) or '.', exist_ok=True)
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.codec = codec
+        self.copy_frames = copy_frames
+        self.frames_written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._encode_worker, daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def resolve_auto_codec(output_video_path):
+        if shutil.which('ffmpeg') is not None:
+            return 'ffmpeg'
+        if os.path.splitext(output_video_path)[1].lower() == '.mp4':
+            return 'mp4v'
+        return 'MJPG'
+
+    def _open_cv2_writer(self, width, height):
+        fourcc = cv2.VideoWriter_fourcc(*self.codec)
+        writer = cv2.VideoWriter(self.output_video_path, fourcc, self.fps, (width, height))
+        if not writer.isOpened():
+            # OpenCV drops every frame silently when the codec does not fit the container
+            raise RuntimeError(f"Could not open {self.output_video_path!r} for writing with codec {self.codec!r}")
+        return writer
+
+    def _open_ffmpeg(self, width, height):
+        command = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+                   '-s', f'{width}x{height}', '-r', str(self.fps),
+                   '-i', '-',
+                   '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+                   self.output_video_path]
+        return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _encode_worker(self):
+        writer = None
+        process = None
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is None:
+                    break
+                if writer is None and process is None:
+                    height, width = frame.shape[:2]
+                    if self.codec == 'ffmpeg':
+                        process = self._open_ffmpeg(width, height)
+                    else:
+                        writer = self._open_cv2_writer(width, height)
+
+                if process is not None:
+                    process.stdin.write(np.ascontiguousarray(frame).tobytes())
+                else:
+                    writer.write(frame)
+                self.frames_written += 1
+        except Exception as e:
+            self._error = e
+            # Keep draining so write() never blocks after a failure
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if writer is not None:
+                writer.release()
+            if process is not None:
+                process.stdin.close()
+                if process.wait() != 0 and self._error is None:
+                    self._error = RuntimeError(f"ffmpeg exited with code {process.returncode}")
+
+    def write(self, frame):
+        if self._closed:
+            raise ValueError("write() on a closed VideoWriter")
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame.copy() if self.copy_frames else frame)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_video(output_video_frames, output_video_path, fps=24, codec='MJPG'):
+    # Accept any iterable (list or lazily rendered generator) of frames
+    with VideoWriter(output_video_path, fps=fps, codec=codec) as writer:
+        for frame in output_video_frames:
+            writer.write(frame)